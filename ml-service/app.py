@@ -1,29 +1,249 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-import tensorflow as tf
-from train_model import EmotionDetectionModel
+from batching import MicroBatcher
+from caching import LRUCache
+from inference import EmotionPredictor, serving_artifact_paths, tflite_model_path
+from metrics import registry as metrics
+from model_registry import ModelRegistry
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import threading
+import queue
+import hmac
+import json
+import time
 import os
 
 app = Flask(__name__)
 CORS(app)
 
-# Initialize model
-sentiment_model = EmotionDetectionModel()
+MODEL_PATH = os.environ.get('MODEL_PATH', 'model/emotion_detection_model')
+LENGTH_BUCKETING = os.environ.get('LENGTH_BUCKETING', '0') == '1'
 
-# Load trained model
-model_path = 'model/emotion_detection_model'
-if os.path.exists(f'{model_path}_tf'):
-    try:
-        sentiment_model.load_model(model_path)
-        print("✅ Model loaded successfully!")
-    except Exception as e:
-        print(f"❌ Error loading model: {e}")
-else:
-    print("⚠️ No trained model found. Please train the model first.")
+# Backend forward pass: 'tf' (SavedModel), 'tflite' ({MODEL_PATH}_{TFLITE_QUANTIZATION}.tflite)
+# atau 'numpy' ({MODEL_PATH}_weights.npz, tanpa TensorFlow)
+MODEL_BACKEND = os.environ.get('MODEL_BACKEND', 'tf')
+TFLITE_QUANTIZATION = os.environ.get('TFLITE_QUANTIZATION', 'dynamic')
+
+# Cache hasil prediksi (key: teks hasil preprocessing + versi model); 0 untuk menonaktifkan
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 10000))
+PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', 3600)) or None
+
+# Hot reload: cek perubahan artefak MODEL_PATH setiap MODEL_WATCH_INTERVAL detik (0 = mati).
+# Endpoint /models/* yang mengubah model butuh header X-Admin-Token = MODEL_ADMIN_TOKEN
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
+MODEL_ADMIN_TOKEN = os.environ.get('MODEL_ADMIN_TOKEN')
+
+# Model dimuat saat pertama dibutuhkan; import app.py tidak memuat TensorFlow
+_preloaded_model = None
+_model_lock = threading.Lock()
+
+# Diset setelah model dimuat dan di-warm-up (lihat /ready)
+model_ready = threading.Event()
+
+
+def has_serving_artifacts(model_path=MODEL_PATH):
+    paths = serving_artifact_paths(model_path)
+    return os.path.exists(paths['config']) and os.path.exists(paths['vocab'])
+
+
+def preload_artifacts(model_path=MODEL_PATH):
+    """Muat vocabulary, config dan preprocessor tanpa TensorFlow (sebelum fork di server pre-fork)"""
+    global _preloaded_model
+    if has_serving_artifacts(model_path):
+        _preloaded_model = EmotionPredictor.load(
+            model_path, use_length_buckets=LENGTH_BUCKETING, load_network=False,
+            backend=MODEL_BACKEND, quantization=TFLITE_QUANTIZATION,
+            result_cache_size=PREDICTION_CACHE_SIZE, result_cache_ttl=PREDICTION_CACHE_TTL
+        )
+    return _preloaded_model
+
+
+def load_sentiment_model(model_path=MODEL_PATH):
+    """Muat artefak serving; artefak pickle lama dimuat lewat train_model sebagai fallback.
+
+    Setiap pemanggilan menghasilkan objek model baru (model aktif tidak diubah di tempat);
+    preprocessor model aktif dipakai ulang agar Sastrawi tidak dimuat dua kali.
+    """
+    global _preloaded_model
+    if _preloaded_model is not None and _preloaded_model.model_path == model_path:
+        preloaded, _preloaded_model = _preloaded_model, None
+        return preloaded.load_network()
+    
+    if has_serving_artifacts(model_path):
+        active = model_registry.active
+        return EmotionPredictor.load(
+            model_path, preprocessor=active.preprocessor if active is not None else None,
+            use_length_buckets=LENGTH_BUCKETING,
+            backend=MODEL_BACKEND, quantization=TFLITE_QUANTIZATION,
+            result_cache_size=PREDICTION_CACHE_SIZE, result_cache_ttl=PREDICTION_CACHE_TTL
+        )
+    
+    print("⚠️ Serving artifacts not found, loading pickled artifacts. "
+          "Run `python train_model.py --export-serving` to create them.")
+    from train_model import EmotionDetectionModel
+    legacy_model = EmotionDetectionModel()
+    legacy_model.use_length_buckets = LENGTH_BUCKETING
+    legacy_model.backend = MODEL_BACKEND
+    legacy_model.tflite_quantization = TFLITE_QUANTIZATION
+    legacy_model.load_model(model_path)
+    predictor = legacy_model.predictor
+    if predictor is not None:
+        predictor.result_cache = (
+            LRUCache(maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL) if PREDICTION_CACHE_SIZE else None
+        )
+    return predictor
+
+
+def model_artifact_path(model_path=MODEL_PATH):
+    """Artefak forward pass untuk MODEL_BACKEND yang dipilih"""
+    if MODEL_BACKEND == 'tflite':
+        return tflite_model_path(model_path, TFLITE_QUANTIZATION)
+    if MODEL_BACKEND == 'numpy':
+        return serving_artifact_paths(model_path)['weights']
+    return serving_artifact_paths(model_path)['model']
+
+
+def artifact_fingerprint(model_path=MODEL_PATH):
+    """(path, mtime, ukuran) artefak forward pass dan config; None jika belum ada"""
+    paths = [model_artifact_path(model_path), serving_artifact_paths(model_path)['config']]
+    fingerprint = []
+    for path in paths:
+        if not os.path.exists(path):
+            return None
+        files = [path] if os.path.isfile(path) else [
+            os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+        ]
+        for file_path in sorted(files):
+            stat = os.stat(file_path)
+            fingerprint.append((file_path, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+
+# Versi model aktif, sebelumnya (rollback) dan kandidat (shadow); satu per proses worker
+model_registry = ModelRegistry(load_sentiment_model)
+
+
+def get_sentiment_model():
+    """Model aktif, dimuat sekali secara thread-safe"""
+    model = model_registry.active
+    if model is None:
+        with _model_lock:
+            if model_registry.active is None:
+                if not os.path.exists(model_artifact_path()):
+                    raise ValueError("No trained model found. Please train the model first.")
+                model_registry.load(MODEL_PATH)
+                model_ready.set()
+                print("✅ Model loaded successfully!")
+                if MODEL_WATCH_INTERVAL > 0:
+                    model_registry.watch(MODEL_PATH, artifact_fingerprint, MODEL_WATCH_INTERVAL)
+            model = model_registry.active
+    return model
+
+
+def predict_batched(items):
+    """Forward pass untuk item batcher (model, teks hasil preprocessing), per objek model.
+
+    Request membawa model yang dipakai saat preprocessing, sehingga request yang masuk
+    sebelum model ditukar tetap di-score (dan dilaporkan) dengan versi yang sama.
+    """
+    results = [None] * len(items)
+    groups = {}
+    for i, (model, processed_text) in enumerate(items):
+        groups.setdefault(id(model), (model, []))[1].append(i)
+    
+    for model, indices in groups.values():
+        predictions = model.predict_preprocessed([items[i][1] for i in indices], use_cache=False)
+        for i, prediction in zip(indices, predictions):
+            results[i] = prediction
+    return results
+
+# Micro-batching untuk /predict: request tunggal yang bersamaan digabung jadi satu forward pass
+# (cache hasil sudah diperiksa di thread request, jadi batcher hanya menerima cache miss)
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 32))
+BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', 5))
+BATCH_MAX_QUEUE = int(os.environ.get('BATCH_MAX_QUEUE', 1024))
+BATCH_TIMEOUT_S = float(os.environ.get('BATCH_TIMEOUT_S', 30))
+
+# Ukuran batch model untuk /predict/stream
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 64))
+
+batcher = MicroBatcher(
+    predict_batched,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    max_queue_size=BATCH_MAX_QUEUE
+)
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy', 'message': 'ML service is running'})
+    health = {
+        'status': 'healthy',
+        'message': 'ML service is running',
+        'batching': batcher.stats()
+    }
+    if model_ready.is_set():
+        model = model_registry.active
+        health['model_version'] = model.model_version
+        if model.result_cache is not None:
+            health['prediction_cache'] = model.result_cache.stats()
+    return jsonify(health)
+
+# Metrik HTTP; durasi /predict/stream hanya sampai response mulai dikirim
+metrics.counter('ml_http_requests_total', 'HTTP requests', labelnames=('endpoint', 'method', 'status'))
+metrics.counter('ml_http_errors_total', 'HTTP requests that failed with a 5xx status', labelnames=('endpoint',))
+metrics.histogram('ml_http_request_duration_seconds', 'HTTP request duration', labelnames=('endpoint',))
+
+def collect_service_metrics():
+    """Gauge yang dibaca saat scrape: statistik batcher, cache hasil dan stem cache"""
+    gauges = [
+        ('ml_model_ready', 'Whether the model is loaded and warmed up', {(): int(model_ready.is_set())}, ()),
+    ]
+    
+    batching = batcher.stats()
+    for key in ('requests', 'rejected', 'timed_out', 'batches', 'batched_items', 'errors', 'queue_depth',
+                'max_queue_depth_seen'):
+        gauges.append((f'ml_batcher_{key}', f'Micro-batcher {key}', {(): batching[key]}, ()))
+    
+    if model_ready.is_set():
+        model = model_registry.active
+        caches = {'stem': model.preprocessor.stem_cache}
+        if model.result_cache is not None:
+            caches['prediction'] = model.result_cache
+        for key in ('size', 'hits', 'misses', 'hit_rate'):
+            samples = {(name,): cache.stats()[key] for name, cache in caches.items()}
+            gauges.append((f'ml_cache_{key}', f'Cache {key}', samples, ('cache',)))
+    
+    return gauges
+
+metrics.register_collector(collect_service_metrics)
+
+@app.before_request
+def start_request_timer():
+    if metrics.enabled:
+        request.environ['ml.start_time'] = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    start = request.environ.get('ml.start_time')
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.inc('ml_http_requests_total', endpoint, request.method, str(response.status_code))
+        metrics.observe('ml_http_request_duration_seconds', time.perf_counter() - start, endpoint)
+        if response.status_code >= 500:
+            metrics.inc('ml_http_errors_total', endpoint)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    if not metrics.enabled:
+        return jsonify({'error': 'Metrics are disabled (METRICS_ENABLED=0)'}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    if not model_ready.is_set():
+        return jsonify({'ready': False}), 503
+    return jsonify({'ready': True})
 
 @app.route('/predict', methods=['POST'])
 def predict_sentiment():
@@ -38,33 +258,28 @@ def predict_sentiment():
         if not text.strip():
             return jsonify({'error': 'Empty text provided'}), 400
         
-        # Predict sentiment
-        result = sentiment_model.predict_emotion(text)
-        
-        # Map sentiment to readable format
-        sentiment_map = {
-            'kesedihan': 'negatif',
-            'kegembiraan': 'positif',
-            'kemarahan': 'negatif',
-            'ketakutan': 'negatif',
-            'cinta': 'positif',
-            'kejutan': 'netral',
-            'sadness': 'negatif',
-            'joy': 'positif',
-            'anger': 'negatif',
-            'fear': 'negatif',
-            'love': 'positif',
-            'surprise': 'netral',
-        }
+        # Preprocess di thread request; cache hit tidak perlu forward pass,
+        # cache miss digabung oleh batcher
+        model = get_sentiment_model()
+        processed_text = model.preprocess_text(text)
+        result = model.cached_prediction(processed_text)
+        if result is None:
+            try:
+                result = batcher.predict((model, processed_text), timeout=BATCH_TIMEOUT_S)
+            except queue.Full:
+                return jsonify({'error': 'Prediction queue is full, try again later'}), 503
+            except FutureTimeoutError:
+                return jsonify({'error': f'Prediction timed out after {BATCH_TIMEOUT_S:g}s'}), 504
         
-        readable_sentiment = sentiment_map.get(result['emotion'], 'netral')
+        model_registry.shadow([processed_text], [result['emotion']], [result['confidence']])
         
         return jsonify({
             'success': True,
             'text': text,
-            'sentiment': readable_sentiment,
+            'sentiment': result['sentiment'],
             'confidence': result['confidence'],
-            'probabilities': result['all_probabilities']
+            'probabilities': result['all_probabilities'],
+            'model_version': model.model_version
         })
         
     except Exception as e:
@@ -79,41 +294,197 @@ def predict_batch():
             return jsonify({'error': 'No texts provided'}), 400
         
         texts = data['texts']
-        results = []
-        
-        for text in texts:
-            if text.strip():
-                result = sentiment_model.predict_emotion(text)
-                sentiment = result['emotion']
-                confidence = result['confidence']
-                sentiment_map = {
-                    'kesedihan': 'negatif',
-                    'kegembiraan': 'positif',
-                    'kemarahan': 'negatif',
-                    'ketakutan': 'negatif',
-                    'cinta': 'positif',
-                    'kejutan': 'netral',
-                    'sadness': 'negatif',
-                    'joy': 'positif',
-                    'anger': 'negatif',
-                    'fear': 'negatif',
-                    'love': 'positif',
-                    'surprise': 'netral',
-                }
-                readable_sentiment = sentiment_map.get(sentiment, 'netral')
-                results.append({
-                    'text': text,
-                    'sentiment': readable_sentiment,
-                    'confidence': confidence
-                })
         
-        return jsonify({
+        if not isinstance(texts, list):
+            return jsonify({'error': 'texts must be a list'}), 400
+        
+        # Probabilitas opsional dalam bentuk ringkas: header `classes` + satu array per item
+        include_probabilities = bool(data.get('include_probabilities'))
+        
+        # Teks kosong tetap dilaporkan pada posisinya
+        results = [
+            {'text': text, 'error': 'Empty text provided'}
+            for text in texts
+        ]
+        valid_indices = [
+            i for i, text in enumerate(texts)
+            if isinstance(text, str) and text.strip()
+        ]
+        
+        # Satu forward pass dan decoding vektor untuk seluruh batch
+        model = get_sentiment_model()
+        processed_texts = model.preprocess_texts([texts[i] for i in valid_indices])
+        table = model.predict_preprocessed_table(processed_texts)
+        model_registry.shadow(processed_texts, table['emotions'].tolist(), table['confidences'].tolist())
+        
+        rows = zip(valid_indices, table['sentiments'].tolist(), table['confidences'].tolist())
+        for i, sentiment, confidence in rows:
+            results[i] = {
+                'text': texts[i],
+                'sentiment': sentiment,
+                'confidence': confidence
+            }
+        
+        response = {
             'success': True,
-            'results': results
-        })
+            'results': results,
+            'model_version': model.model_version
+        }
+        if include_probabilities:
+            response['classes'] = model.classes
+            for i, probabilities in zip(valid_indices, table['probabilities'].tolist()):
+                results[i]['probabilities'] = probabilities
+        
+        return jsonify(response)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def iter_ndjson_batches(stream, batch_size):
+    """Baca NDJSON baris per baris dan kelompokkan per batch_size sebagai (nomor baris, objek, error)"""
+    batch = []
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        
+        item, error = None, None
+        try:
+            item = json.loads(line)
+        except ValueError:
+            error = 'Invalid JSON'
+        else:
+            if not isinstance(item, dict):
+                item, error = None, 'Each line must be a JSON object'
         
+        batch.append((line_number, item, error))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    
+    if batch:
+        yield batch
+
+@app.route('/predict/stream', methods=['POST'])
+def predict_stream():
+    """Scoring massal: input NDJSON {"id": ..., "text": ...} per baris, output NDJSON per baris.
+
+    Input dibaca dari request stream secara bertahap dan diproses per STREAM_BATCH_SIZE;
+    hasil dikirim segera setelah tiap batch selesai, dengan urutan sama seperti input.
+    Generator baru membaca batch berikutnya ketika output sebelumnya sudah dikonsumsi
+    client (backpressure), jadi memori tetap konstan berapa pun jumlah barisnya.
+    """
+    try:
+        model = get_sentiment_model()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        for batch in iter_ndjson_batches(request.stream, STREAM_BATCH_SIZE):
+            # Baris tidak valid dilaporkan pada posisinya
+            results = [
+                {'line': line_number, 'error': error} if error
+                else {'id': item.get('id'), 'error': 'Empty text provided'}
+                for line_number, item, error in batch
+            ]
+            valid_indices = [
+                i for i, (_, item, _) in enumerate(batch)
+                if item is not None and isinstance(item.get('text'), str) and item['text'].strip()
+            ]
+            
+            # Satu forward pass per batch
+            table = model.predict_emotions_table([batch[i][1]['text'] for i in valid_indices])
+            
+            rows = zip(valid_indices, table['sentiments'].tolist(), table['confidences'].tolist())
+            for i, sentiment, confidence in rows:
+                results[i] = {
+                    'id': batch[i][1].get('id'),
+                    'sentiment': sentiment,
+                    'confidence': confidence
+                }
+            
+            yield ''.join(json.dumps(result, ensure_ascii=False) + '\n' for result in results)
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['X-Model-Version'] = model.model_version
+    return response
+
+def require_admin_token():
+    """Response error jika endpoint admin tidak diizinkan, None jika boleh lanjut"""
+    if not MODEL_ADMIN_TOKEN:
+        return jsonify({'error': 'Model management is disabled (set MODEL_ADMIN_TOKEN)'}), 404
+    # Perbandingan waktu-konstan; bytes agar header non-ASCII tidak memicu TypeError
+    token = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(token.encode('utf-8'), MODEL_ADMIN_TOKEN.encode('utf-8')):
+        return jsonify({'error': 'Invalid admin token'}), 403
+    return None
+
+@app.route('/models', methods=['GET'])
+def models_status():
+    return jsonify(model_registry.status())
+
+@app.route('/models/load', methods=['POST'])
+def models_load():
+    """Muat model di background: {"model_path": ..., "shadow_percent": 10} (tanpa shadow_percent
+    model langsung menggantikan model aktif setelah warm-up)"""
+    error = require_admin_token()
+    if error:
+        return error
+    
+    data = request.get_json(silent=True) or {}
+    model_path = data.get('model_path', MODEL_PATH)
+    shadow_percent = data.get('shadow_percent')
+    if not os.path.exists(model_artifact_path(model_path)):
+        return jsonify({'error': f'No model artifacts found at {model_path}'}), 400
+    if shadow_percent is not None and not (
+        isinstance(shadow_percent, (int, float)) and not isinstance(shadow_percent, bool)
+        and 0 <= shadow_percent <= 100
+    ):
+        return jsonify({'error': 'shadow_percent must be a number between 0 and 100'}), 400
+    
+    try:
+        status = model_registry.load_async(model_path, shadow_percent=shadow_percent)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'success': True, 'loading': status}), 202
+
+@app.route('/models/rollback', methods=['POST'])
+def models_rollback():
+    error = require_admin_token()
+    if error:
+        return error
+    
+    try:
+        model = model_registry.rollback()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'success': True, 'model_version': model.model_version})
+
+@app.route('/models/promote', methods=['POST'])
+def models_promote():
+    error = require_admin_token()
+    if error:
+        return error
+    
+    try:
+        model = model_registry.promote()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'success': True, 'model_version': model.model_version})
+
+@app.route('/models/candidate', methods=['DELETE'])
+def models_clear_candidate():
+    error = require_admin_token()
+    if error:
+        return error
+    
+    model_registry.clear_candidate()
+    return jsonify({'success': True})
 
 if __name__ == '__main__':
+    try:
+        get_sentiment_model()
+    except Exception as e:
+        print(f"❌ Error loading model: {e}")
+    
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,146 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+
+class MicroBatcher:
+    """Gabungkan request prediksi tunggal yang datang bersamaan menjadi satu batch.
+
+    Request dimasukkan ke antrian; worker thread menunggu sampai max_batch_size
+    item terkumpul atau max_wait_ms berlalu sejak item pertama, lalu menjalankan
+    satu forward pass lewat predict_fn dan membagikan hasilnya ke setiap request.
+
+    Worker thread baru dijalankan pada submit pertama di setiap proses, sehingga
+    aman dibuat sebelum server pre-fork membuat proses worker.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5, max_queue_size=1024):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue_size = max_queue_size
+
+        self._queue = None
+        self._worker = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'rejected': 0,
+            'batches': 0,
+            'batched_items': 0,
+            'errors': 0,
+            'timed_out': 0,
+            'max_batch_size_seen': 0,
+            'max_queue_depth_seen': 0,
+        }
+
+    def _ensure_worker(self):
+        # Thread tidak ikut ter-fork: buat antrian dan worker baru untuk proses ini
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue_size)
+            self._worker = threading.Thread(target=self._run, args=(self._queue,),
+                                            name='micro-batcher', daemon=True)
+            self._worker.start()
+            self._pid = os.getpid()
+
+    def submit(self, item):
+        """Masukkan satu item ke antrian dan kembalikan Future untuk hasilnya"""
+        self._ensure_worker()
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise
+
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['max_queue_depth_seen'] = max(
+                self._stats['max_queue_depth_seen'], self._queue.qsize()
+            )
+        return future
+
+    def predict(self, item, timeout=None):
+        """Submit item lalu tunggu hasil prediksinya.
+
+        Jika timeout habis, future dibatalkan agar worker tidak menjalankan forward pass
+        untuk item yang tidak lagi ditunggu, lalu TimeoutError diteruskan ke pemanggil.
+        """
+        future = self.submit(item)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            with self._lock:
+                self._stats['timed_out'] += 1
+            raise
+
+    def stats(self):
+        """Statistik antrian dan ukuran batch"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize() if self._pid == os.getpid() else 0
+        stats['avg_batch_size'] = (
+            stats['batched_items'] / stats['batches'] if stats['batches'] else 0.0
+        )
+        stats['config'] = {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'max_queue_size': self.max_queue_size,
+        }
+        return stats
+
+    def _collect_batch(self, pending):
+        # Blok sampai ada item pertama, lalu kumpulkan sampai penuh atau timeout
+        batch = [pending.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self, pending):
+        while True:
+            # Item yang future-nya sudah dibatalkan (timeout) dilewati
+            batch = [
+                (item, future) for item, future in self._collect_batch(pending)
+                if future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+
+            try:
+                results = self.predict_fn(items)
+            except Exception as e:
+                with self._lock:
+                    self._stats['errors'] += 1
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                self._stats['batches'] += 1
+                self._stats['batched_items'] += len(batch)
+                self._stats['max_batch_size_seen'] = max(
+                    self._stats['max_batch_size_seen'], len(batch)
+                )
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,345 @@
+import argparse
+import copy
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from inference import EMOTION_LABELS, EmotionPredictor, pad_post
+from text_preprocessing import LANGUAGES, TextPreprocessor
+
+# Arah metrik untuk perbandingan baseline: True jika nilai lebih besar lebih baik
+HIGHER_IS_BETTER_SUFFIXES = ('_per_s', '_accuracy')
+
+
+def percentile_ms(timings, q):
+    return float(np.percentile(timings, q) * 1000.0)
+
+
+def time_calls(fn, inputs, repeats):
+    """Jalankan fn untuk setiap input sebanyak repeats kali dan kembalikan durasinya (detik)"""
+    timings = []
+    for _ in range(repeats):
+        for batch in inputs:
+            start = time.perf_counter()
+            fn(batch)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def peak_rss_mb():
+    """Peak RSS proses ini dalam MB (ru_maxrss dalam KB di Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_workload_texts(csv_paths, num_texts):
+    """Ambil num_texts teks per dataset (data_indo + test_inggris) sebagai workload"""
+    texts = []
+    for csv_path in csv_paths:
+        df = pd.read_csv(csv_path, on_bad_lines='skip')
+        texts.extend(df['text'].dropna().astype(str).head(num_texts).tolist())
+    return texts
+
+
+def load_labelled_texts(csv_paths, num_texts):
+    """Seperti load_workload_texts, ditambah label dataset yang dipetakan ke kelas emosi model"""
+    texts, labels = [], []
+    for csv_path in csv_paths:
+        df = pd.read_csv(csv_path, on_bad_lines='skip').dropna(subset=['text', 'label']).head(num_texts)
+        texts.extend(df['text'].astype(str).tolist())
+        for label in df['label']:
+            label = str(label).lower().strip()
+            labels.append(EMOTION_LABELS.get(label, label))
+    return texts, labels
+
+
+def load_sample_token_sequences(model, csv_path, num_texts):
+    """Ambil teks dari dataset lalu preprocess dan tokenize seperti di jalur prediksi"""
+    df = pd.read_csv(csv_path, on_bad_lines='skip')
+    texts = df['text'].astype(str).head(num_texts).tolist()
+    return model.texts_to_sequences(model.preprocess_texts(texts))
+
+
+def compare_predict_paths(model, padded_sequences, batch_size, repeats):
+    """Bandingkan latency model.predict dengan serving function yang sudah di-compile"""
+    inputs = [
+        padded_sequences[start:start + batch_size]
+        for start in range(0, len(padded_sequences), batch_size)
+    ]
+
+    paths = {
+        'model.predict': lambda batch: model.model.predict(batch, verbose=0),
+        'serving_fn': lambda batch: model.serving_fn(batch).numpy(),
+    }
+
+    results = {}
+    for name, fn in paths.items():
+        fn(inputs[0])  # warm-up
+        timings = time_calls(fn, inputs, repeats)
+        results[name] = {
+            'p50_ms': percentile_ms(timings, 50),
+            'p99_ms': percentile_ms(timings, 99),
+        }
+    return results
+
+
+def compare_bucketing(model, sequences, batch_size, repeats):
+    """Bandingkan padding penuh dengan length bucketing: latency dan selisih output"""
+    inputs = [
+        sequences[start:start + batch_size]
+        for start in range(0, len(sequences), batch_size)
+    ]
+
+    results = {}
+    outputs = {}
+    for use_buckets in (False, True):
+        model.use_length_buckets = use_buckets
+        name = 'bucketed' if use_buckets else 'full_padding'
+        fn = lambda batch: model.predict_sequences(batch, batch_size=batch_size)
+        fn(inputs[0])  # warm-up
+        timings = time_calls(fn, inputs, repeats)
+        outputs[name] = np.concatenate([fn(batch) for batch in inputs], axis=0)
+        results[name] = {
+            'p50_ms': percentile_ms(timings, 50),
+            'p99_ms': percentile_ms(timings, 99),
+        }
+
+    difference = np.abs(outputs['bucketed'] - outputs['full_padding'])
+    agreement = np.mean(
+        np.argmax(outputs['bucketed'], axis=1) == np.argmax(outputs['full_padding'], axis=1)
+    )
+    results['max_abs_probability_delta'] = float(difference.max())
+    results['label_agreement'] = float(agreement)
+    return results
+
+
+def bench_preprocessing(texts, cold_texts):
+    """Throughput preprocess_text dengan stem cache kosong (cold, cold_texts teks pertama;
+    stemming Sastrawi untuk kata baru lambat), stem cache terisi (warm, semua teks) dan
+    preprocess_texts untuk seluruh workload sekaligus (batch, cache terisi)"""
+    preprocessor = TextPreprocessor()
+    results = {}
+    for name, sample in (('cold', texts[:cold_texts]), ('warm', texts)):
+        if name == 'warm':
+            # Isi stem cache untuk semua teks agar yang diukur benar-benar cache hit
+            preprocessor.preprocess_texts(texts)
+        start = time.perf_counter()
+        for text in sample:
+            preprocessor.preprocess_text(text)
+        results[f'preprocess_{name}_texts_per_s'] = len(sample) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    preprocessor.preprocess_texts(texts)
+    results['preprocess_batch_texts_per_s'] = len(texts) / (time.perf_counter() - start)
+    return results
+
+
+def bench_languages(model, texts, labels, repeats):
+    """Per bahasa hasil deteksi: throughput preprocess_texts dengan dan tanpa language routing
+    (stem cache terisi) dan akurasi model terhadap label dataset"""
+    languages = model.preprocessor.detect_languages(texts)
+    results = {}
+    for language in LANGUAGES:
+        indices = [i for i, detected in enumerate(languages) if detected == language]
+        if not indices:
+            continue
+        sample = [texts[i] for i in indices]
+
+        for routing, suffix in ((True, ''), (False, '_unrouted')):
+            # Salinan dangkal: Sastrawi dan stem cache dipakai bersama model
+            preprocessor = copy.copy(model.preprocessor)
+            preprocessor.language_routing = routing
+            preprocessor.preprocess_texts(sample)  # warm-up stem cache
+            timings = time_calls(preprocessor.preprocess_texts, [sample], repeats)
+            results[f'preprocess_{language}{suffix}_texts_per_s'] = len(sample) * len(timings) / sum(timings)
+
+        # Akurasi memakai preprocessing sesuai setting model
+        predicted = model.predict_emotions_table(sample)['emotions']
+        results[f'{language}_accuracy'] = float(np.mean([
+            emotion == labels[i] for emotion, i in zip(predicted, indices)
+        ]))
+    return results
+
+
+def bench_single_request(model, texts, repeats):
+    """Latency end-to-end predict_emotion (preprocess + forward pass) per request"""
+    model.predict_emotion(texts[0])  # warm-up
+    timings = time_calls(lambda text: model.predict_emotion(text), texts, repeats)
+    return {
+        'single_p50_ms': percentile_ms(timings, 50),
+        'single_p95_ms': percentile_ms(timings, 95),
+        'single_p99_ms': percentile_ms(timings, 99),
+    }
+
+
+def bench_batch_throughput(model, processed_texts, batch_sizes, repeats):
+    """Throughput predict_preprocessed (tokenize + pad + forward pass) per ukuran batch"""
+    results = {}
+    for batch_size in batch_sizes:
+        batches = [
+            processed_texts[start:start + batch_size]
+            for start in range(0, len(processed_texts) - batch_size + 1, batch_size)
+        ] or [processed_texts[:batch_size]]
+        model.predict_preprocessed(batches[0], batch_size=batch_size)  # warm-up
+        timings = time_calls(lambda batch: model.predict_preprocessed(batch, batch_size=batch_size),
+                             batches, repeats)
+        results[f'batch_{batch_size}_texts_per_s'] = len(batches[0]) * len(timings) / sum(timings)
+    return results
+
+
+def measure_cold_start(model_path, backend, sample_text):
+    """Jalankan proses baru: import, load model, prediksi pertama; ukur waktu dan peak RSS"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--model-path', model_path, '--backend', backend,
+         '--cold-start-child', sample_text],
+        check=True, stdout=subprocess.PIPE
+    ).stdout.decode('utf-8')
+    # Baris terakhir adalah hasil JSON; baris lain adalah log saat memuat model
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def cold_start_child(model_path, backend, sample_text):
+    start = time.perf_counter()
+    model = EmotionPredictor.load(model_path, backend=backend, result_cache_size=0)
+    loaded = time.perf_counter()
+    model.predict_emotion(sample_text)
+    first_prediction = time.perf_counter()
+    return {
+        'cold_start_load_s': loaded - start,
+        'cold_start_first_prediction_s': first_prediction - start,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_suite(args):
+    texts = load_workload_texts(args.data, args.num_texts)
+    print(f"📊 Workload: {len(texts)} texts from {', '.join(args.data)}")
+
+    metrics = measure_cold_start(args.model_path, args.backend, texts[0])
+    print(f"⏱️  Cold start: load {metrics['cold_start_load_s']:.2f}s, "
+          f"first prediction {metrics['cold_start_first_prediction_s']:.2f}s, peak RSS {metrics['peak_rss_mb']:.0f} MB")
+
+    metrics.update(bench_preprocessing(texts, args.cold_texts))
+    print(f"⏱️  Preprocessing: cold {metrics['preprocess_cold_texts_per_s']:.1f} texts/s, "
+          f"warm {metrics['preprocess_warm_texts_per_s']:.1f} texts/s, "
+          f"batch {metrics['preprocess_batch_texts_per_s']:.1f} texts/s")
+
+    # Cache hasil dimatikan agar yang diukur benar-benar forward pass
+    model = EmotionPredictor.load(args.model_path, backend=args.backend, result_cache_size=0)
+    processed_texts = model.preprocess_texts(texts)
+
+    metrics.update(bench_single_request(model, texts[:args.single_requests], args.repeats))
+    print(f"⏱️  Single request: p50={metrics['single_p50_ms']:.2f} ms  "
+          f"p95={metrics['single_p95_ms']:.2f} ms  p99={metrics['single_p99_ms']:.2f} ms")
+
+    for name, value in bench_batch_throughput(model, processed_texts, args.batch_sizes, args.repeats).items():
+        metrics[name] = value
+        print(f"⏱️  {name}: {value:.1f}")
+
+    languages = bench_languages(model, *load_labelled_texts(args.data, args.num_texts), args.repeats)
+    metrics.update(languages)
+    for language in LANGUAGES:
+        if f'{language}_accuracy' not in languages:
+            continue
+        print(f"🌐 {language}: preprocessing {languages[f'preprocess_{language}_texts_per_s']:.1f} texts/s routed, "
+              f"{languages[f'preprocess_{language}_unrouted_texts_per_s']:.1f} texts/s unrouted; "
+              f"accuracy {languages[f'{language}_accuracy'] * 100:.1f}%")
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'model_version': model.model_version,
+            'backend': args.backend,
+            'language_routing': model.preprocessor.language_routing,
+            'num_texts': len(texts),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+        },
+        'metrics': metrics,
+    }
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """Bandingkan metrik dengan baseline; kembalikan daftar metrik yang memburuk lebih dari threshold"""
+    regressions = []
+    print(f"\n📊 {'metric':34s} {'baseline':>12s} {'current':>12s} {'change':>9s}")
+    for name, baseline_value in baseline['metrics'].items():
+        value = results['metrics'].get(name)
+        if value is None or not baseline_value:
+            continue
+
+        change = (value - baseline_value) / baseline_value
+        higher_is_better = name.endswith(HIGHER_IS_BETTER_SUFFIXES)
+        regressed = (-change if higher_is_better else change) > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"   {name:34s} {baseline_value:12.3f} {value:12.3f} {change * 100:+8.1f}%"
+              f"{'  ❌' if regressed else ''}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark inference latency of the emotion model')
+    parser.add_argument('--model-path', default='model/emotion_detection_model')
+    parser.add_argument('--backend', choices=['tf', 'tflite', 'numpy'], default='tf')
+    parser.add_argument('--data', nargs='+', default=['data/data_indo.csv', 'data/test_inggris.csv'])
+    parser.add_argument('--num-texts', type=int, default=200, help='Texts taken from each dataset')
+    parser.add_argument('--cold-texts', type=int, default=50,
+                        help='Texts preprocessed with an empty stem cache')
+    parser.add_argument('--single-requests', type=int, default=100)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32, 128])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', default=None, help='Write results to this JSON file')
+    parser.add_argument('--baseline', default=None, help='Compare against a previous --output file')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative slowdown that counts as a regression (0.1 = 10%%)')
+    parser.add_argument('--compare-paths', action='store_true',
+                        help='Compare model.predict with the compiled serving function instead of running the suite')
+    parser.add_argument('--buckets', action='store_true',
+                        help='Compare length-bucketed inference with full max_length padding instead of running the suite')
+    # Internal: proses anak untuk pengukuran cold start
+    parser.add_argument('--cold-start-child', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_start_child is not None:
+        print(json.dumps(cold_start_child(args.model_path, args.backend, args.cold_start_child)))
+        sys.exit(0)
+
+    if not (args.compare_paths or args.buckets):
+        results = run_suite(args)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            print(f"💾 Results written to {args.output}")
+        if args.baseline:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                regressions = compare_with_baseline(results, json.load(f), args.threshold)
+            if regressions:
+                sys.exit(f"❌ Regression over {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+            print("✅ No regressions against baseline")
+        sys.exit(0)
+
+    emotion_model = EmotionPredictor.load(args.model_path, use_length_buckets=args.buckets)
+
+    sequences = load_sample_token_sequences(emotion_model, args.data[0], args.num_texts)
+    padded_sequences = pad_post(sequences, emotion_model.max_length)
+
+    for batch_size in args.batch_sizes:
+        print(f"\n⏱️  Batch size {batch_size}:")
+        results = compare_predict_paths(emotion_model, padded_sequences, batch_size, args.repeats)
+        for name, stats in results.items():
+            print(f"  {name:14s} p50={stats['p50_ms']:.2f} ms  p99={stats['p99_ms']:.2f} ms")
+
+        if args.buckets:
+            results = compare_bucketing(emotion_model, sequences, batch_size, args.repeats)
+            for name in ('full_padding', 'bucketed'):
+                stats = results[name]
+                print(f"  {name:14s} p50={stats['p50_ms']:.2f} ms  p99={stats['p99_ms']:.2f} ms")
+            print(f"  max |Δp| = {results['max_abs_probability_delta']:.5f}, "
+                  f"label agreement = {results['label_agreement'] * 100:.1f}%")
@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Cache LRU thread-safe dengan batas jumlah entry, TTL opsional dan hit/miss counter"""
+
+    def __init__(self, maxsize=100000, track_new=False, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        # Waktu kedaluwarsa per key (time.monotonic), hanya jika ttl diset
+        self._expires = {} if ttl else None
+        self._lock = threading.Lock()
+        # Key yang baru ditambahkan sejak drain_new() terakhir (mis. untuk digabung dari worker)
+        self._new_keys = [] if track_new else None
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if self._expires is not None and self._expires[key] <= time.monotonic():
+                del self._data[key]
+                del self._expires[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_many(self, keys):
+        """{key: value} untuk key yang ada di cache, dengan satu kali ambil lock"""
+        found = {}
+        with self._lock:
+            now = time.monotonic() if self._expires is not None else None
+            for key in keys:
+                try:
+                    value = self._data[key]
+                except KeyError:
+                    self.misses += 1
+                    continue
+                if now is not None and self._expires[key] <= now:
+                    del self._data[key]
+                    del self._expires[key]
+                    self.misses += 1
+                    continue
+                self._data.move_to_end(key)
+                self.hits += 1
+                found[key] = value
+        return found
+
+    def set(self, key, value):
+        with self._lock:
+            if self._new_keys is not None and key not in self._data:
+                self._new_keys.append(key)
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self._expires is not None:
+                self._expires[key] = time.monotonic() + self.ttl
+            while len(self._data) > self.maxsize:
+                evicted_key, _ = self._data.popitem(last=False)
+                if self._expires is not None:
+                    del self._expires[evicted_key]
+
+    def items(self):
+        """Salinan entry, dari yang paling lama sampai yang terakhir dipakai"""
+        with self._lock:
+            return list(self._data.items())
+
+    def drain_new(self):
+        """Entry yang ditambahkan sejak pemanggilan terakhir (hanya jika track_new=True)"""
+        with self._lock:
+            if not self._new_keys:
+                return []
+            entries = [(key, self._data[key]) for key in self._new_keys if key in self._data]
+            self._new_keys = []
+            return entries
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            if self._expires is not None:
+                self._expires.clear()
+            if self._new_keys is not None:
+                self._new_keys = []
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def save(self, path):
+        """Simpan entry ke JSON (urutan LRU dipertahankan); ditulis atomik lewat file sementara"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.items(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Muat entry dari file hasil save(); kembalikan jumlah entry yang dimuat"""
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+
+        for key, value in entries:
+            self.set(key, value)
+        return len(entries)
@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from inference import EmotionPredictor, pad_post, serving_artifact_paths, tflite_model_path
+
+VARIANTS = ('tf', 'tflite-dynamic', 'tflite-float16')
+
+
+def current_rss_mb():
+    """RSS proses saat ini (Linux), dalam MB"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def artifact_size_mb(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path) / 1e6
+
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / 1e6
+
+
+def variant_artifact(model_path, variant):
+    if variant == 'tf':
+        return serving_artifact_paths(model_path)['model']
+    return tflite_model_path(model_path, variant.split('-', 1)[1])
+
+
+def build_held_out_split(model_path, dataset_configs, workers):
+    """Bangun ulang split held-out seperti EmotionDetectionModel.train.
+
+    train_test_split(test_size=0.2, random_state=42, stratify=y) hanya bergantung pada jumlah
+    sampel dan label, jadi split index di sini sama dengan split saat training (mode in-memory).
+    """
+    from sklearn.model_selection import train_test_split
+    from train_model import EmotionDetectionModel
+
+    predictor = EmotionPredictor.load(model_path, load_network=False)
+    trainer = EmotionDetectionModel()
+    trainer.preprocessor = predictor.preprocessor
+    texts, emotions = trainer.load_multiple_emotion_datasets(dataset_configs, workers=workers)
+
+    class_index = {label: index for index, label in enumerate(predictor.classes)}
+    labels = np.array([class_index[emotion] for emotion in emotions])
+    indices = np.arange(len(texts))
+    _, test_indices = train_test_split(indices, test_size=0.2, random_state=42, stratify=labels)
+
+    sequences = predictor.texts_to_sequences([texts[i] for i in test_indices])
+    return pad_post(sequences, predictor.max_length), labels[test_indices]
+
+
+def evaluate_variant(model_path, variant, test_set_path, repeats):
+    """Ukur satu varian di proses ini; dipanggil di subprocess agar memorinya terpisah"""
+    data = np.load(test_set_path)
+    sequences, labels = data['sequences'], data['labels']
+
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    if variant == 'tf':
+        predictor = EmotionPredictor.load(model_path, result_cache_size=0)
+    else:
+        predictor = EmotionPredictor.load(
+            model_path, backend='tflite', quantization=variant.split('-', 1)[1], result_cache_size=0
+        )
+    load_seconds = time.perf_counter() - start
+    rss_loaded = current_rss_mb()
+
+    latencies = {}
+    for batch_size in (1, 32):
+        batch = sequences[:batch_size]
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predictor.predict_probabilities(batch)
+            timings.append(time.perf_counter() - start)
+        latencies[f'batch_{batch_size}'] = {
+            'p50_ms': float(np.percentile(timings, 50) * 1000),
+            'p99_ms': float(np.percentile(timings, 99) * 1000),
+        }
+
+    probabilities = predictor.predict_probabilities(sequences)
+    predicted = np.argmax(probabilities, axis=1)
+
+    return {
+        'variant': variant,
+        'size_mb': artifact_size_mb(variant_artifact(model_path, variant)),
+        'load_seconds': load_seconds,
+        'rss_model_mb': rss_loaded - rss_before,
+        'peak_rss_mb': peak_rss_mb(),
+        'latency': latencies,
+        'accuracy': float(np.mean(predicted == labels)),
+        'predicted': predicted.tolist(),
+        'probabilities': probabilities.tolist(),
+    }
+
+
+def run_variant_subprocess(model_path, variant, test_set_path, repeats):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--model-path', model_path, '--variant', variant,
+         '--test-set', test_set_path, '--repeats', str(repeats)],
+        check=True, stdout=subprocess.PIPE
+    ).stdout.decode('utf-8')
+    # Baris terakhir adalah hasil JSON; baris lain adalah log saat memuat model
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def print_report(results):
+    baseline = results.get('tf')
+    print(f"\n📊 {'variant':16s} {'size MB':>8s} {'RSS MB':>8s} {'peak MB':>8s} "
+          f"{'p50@1':>8s} {'p50@32':>8s} {'accuracy':>9s} {'Δacc':>7s} {'agree':>7s} {'max|Δp|':>8s}")
+    for variant, stats in results.items():
+        delta_accuracy = stats['accuracy'] - baseline['accuracy'] if baseline else 0.0
+        agreement = max_delta = float('nan')
+        if baseline:
+            agreement = np.mean(np.array(stats['predicted']) == np.array(baseline['predicted']))
+            max_delta = np.abs(np.array(stats['probabilities']) - np.array(baseline['probabilities'])).max()
+        print(f"   {variant:16s} {stats['size_mb']:8.1f} {stats['rss_model_mb']:8.1f} {stats['peak_rss_mb']:8.1f} "
+              f"{stats['latency']['batch_1']['p50_ms']:8.2f} {stats['latency']['batch_32']['p50_ms']:8.2f} "
+              f"{stats['accuracy']:9.4f} {delta_accuracy:+7.4f} {agreement * 100:6.1f}% {max_delta:8.5f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Compare float32 SavedModel and quantized TFLite variants on the held-out split'
+    )
+    parser.add_argument('--model-path', default='model/emotion_detection_model')
+    parser.add_argument('--variants', nargs='+', choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument('--data', nargs='+', default=['data/data_indo.csv', 'data/test_inggris.csv'],
+                        help='Training datasets (text,label with header), in training order')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--json', default=None, help='Also write the summary to this JSON file')
+    # Internal: evaluasi satu varian di subprocess
+    parser.add_argument('--variant', choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument('--test-set', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(evaluate_variant(args.model_path, args.variant, args.test_set, args.repeats)))
+        sys.exit(0)
+
+    dataset_configs = [
+        {'path': path, 'has_header': True, 'text_column': 'text', 'emotion_column': 'label'}
+        for path in args.data
+    ]
+    sequences, labels = build_held_out_split(args.model_path, dataset_configs, args.workers)
+    print(f"📊 Held-out samples: {len(labels)}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        test_set_path = os.path.join(tmp_dir, 'test_set.npz')
+        np.savez(test_set_path, sequences=sequences, labels=labels)
+
+        for variant in args.variants:
+            if not os.path.exists(variant_artifact(args.model_path, variant)):
+                print(f"⚠️  Skipping {variant}: {variant_artifact(args.model_path, variant)} not found")
+                continue
+            print(f"\n⏱️  Evaluating {variant}...")
+            results[variant] = run_variant_subprocess(args.model_path, variant, test_set_path, args.repeats)
+
+    print_report(results)
+
+    if args.json:
+        summary = {
+            variant: {key: value for key, value in stats.items() if key not in ('predicted', 'probabilities')}
+            for variant, stats in results.items()
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
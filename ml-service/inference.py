@@ -0,0 +1,515 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from caching import LRUCache
+from metrics import registry as metrics
+from text_preprocessing import TextPreprocessor
+
+# Karakter yang dibuang Keras Tokenizer sebelum split (nilai default `filters`)
+TOKENIZER_FILTERS = '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n'
+
+# Map emotion to readable sentiment
+SENTIMENT_MAP = {
+    'kesedihan': 'negatif',
+    'kegembiraan': 'positif',
+    'kemarahan': 'negatif',
+    'ketakutan': 'negatif',
+    'cinta': 'positif',
+    'kejutan': 'netral',
+    'sadness': 'negatif',
+    'joy': 'positif',
+    'anger': 'negatif',
+    'fear': 'negatif',
+    'love': 'positif',
+    'surprise': 'netral',
+}
+
+# Label dataset (Indonesia, Inggris atau angka) ke kelas emosi yang dipakai saat training
+EMOTION_LABELS = {
+    'kesedihan': 0,
+    'kegembiraan': 1,
+    'kemarahan': 2,
+    'ketakutan': 3,
+    'cinta': 4,
+    'kejutan': 5,
+    'sadness': 0,
+    'joy': 1,
+    'anger': 2,
+    'fear': 3,
+    'love': 4,
+    'surprise': 5,
+    '0': 0,
+    '1': 1,
+    '2': 2,
+    '3': 3,
+    '4': 4,
+    '5': 5
+}
+
+# Varian post-training quantization untuk backend TFLite
+TFLITE_QUANTIZATIONS = ('dynamic', 'float16')
+
+
+def serving_artifact_paths(model_path):
+    """Path artefak serving ringan (tanpa pickle) untuk prefix model_path"""
+    return {
+        'model': f'{model_path}_tf',
+        'vocab': f'{model_path}_vocab.txt',
+        'config': f'{model_path}_serving.json',
+        'stem_cache': f'{model_path}_stem_cache.json',
+        'weights': f'{model_path}_weights.npz',
+    }
+
+
+def tflite_model_path(model_path, quantization='dynamic'):
+    """Path flatbuffer TFLite hasil quantization untuk prefix model_path"""
+    return f'{model_path}_{quantization}.tflite'
+
+
+def write_serving_artifacts(model_path, vocabulary, classes, max_length, vocab_size, oov_index,
+                            preprocessing=None):
+    """Tulis vocabulary (satu kata per baris, baris ke-i = index i) dan config JSON"""
+    paths = serving_artifact_paths(model_path)
+
+    with open(paths['vocab'], 'w', encoding='utf-8') as f:
+        for word in vocabulary:
+            f.write(f'{word}\n')
+
+    config = {
+        'max_length': max_length,
+        'vocab_size': vocab_size,
+        'oov_index': oov_index,
+        'classes': classes,
+        'preprocessing': preprocessing or {},
+    }
+    with open(paths['config'], 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+
+
+def saved_model_version(model_dir):
+    """Versi model dari fingerprint SavedModel (atau saved_model.pb untuk SavedModel lama)"""
+    for filename in ('fingerprint.pb', 'saved_model.pb'):
+        path = os.path.join(model_dir, filename)
+        if os.path.exists(path):
+            return file_version(path)
+    return 'unknown'
+
+
+def file_version(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def load_tflite_interpreter(tflite_path):
+    """Interpreter TFLite; pakai LiteRT / tflite_runtime jika terpasang agar TensorFlow tidak di-import"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+    interpreter = Interpreter(model_path=tflite_path)
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+def pad_post(sequences, maxlen):
+    """Setara pad_sequences(sequences, maxlen, padding='post', truncating='pre')"""
+    padded = np.zeros((len(sequences), maxlen), dtype=np.int32)
+    for i, sequence in enumerate(sequences):
+        sequence = sequence[-maxlen:]
+        padded[i, :len(sequence)] = sequence
+    return padded
+
+
+class EmotionPredictor:
+    """Jalur inferensi: preprocessing, tokenisasi, forward pass dan decoding label.
+
+    Tidak bergantung pada pandas, scikit-learn maupun kode training. TensorFlow baru
+    di-import saat model dimuat.
+    """
+
+    def __init__(self, model, word_index, classes, max_length, vocab_size, oov_index=1,
+                 preprocessor=None, use_length_buckets=False, length_buckets=(16, 32, 64),
+                 model_version='unsaved', result_cache_size=10000, result_cache_ttl=3600,
+                 backend='tf', quantization='dynamic'):
+        self.model = model
+        self.model_path = None
+        self.model_version = model_version
+
+        # Backend forward pass: 'tf' (SavedModel), 'tflite' (flatbuffer hasil quantization)
+        # atau 'numpy' (bobot .npz dievaluasi dengan NumPy, tanpa TensorFlow)
+        self.backend = backend
+        self.quantization = quantization
+        self.interpreter = None
+        self.numpy_model = None
+        self._interpreter_lock = threading.Lock()
+        self.word_index = word_index
+        self.classes = list(classes)
+
+        # Tabel index kelas -> (emotion, sentiment), dihitung sekali saat load
+        self.class_sentiments = [SENTIMENT_MAP.get(label, 'netral') for label in self.classes]
+        self._class_table = np.array(self.classes, dtype=object)
+        self._sentiment_table = np.array(self.class_sentiments, dtype=object)
+        self.max_length = max_length
+        self.vocab_size = vocab_size
+        self.oov_index = oov_index
+        self.preprocessor = preprocessor or TextPreprocessor()
+
+        # Length bucketing: pad ke bucket terkecil yang cukup, bukan selalu max_length
+        self.length_buckets = length_buckets
+        self.use_length_buckets = use_length_buckets
+
+        # Cache hasil prediksi per teks hasil preprocessing; 0 untuk menonaktifkan
+        self.result_cache = (
+            LRUCache(maxsize=result_cache_size, ttl=result_cache_ttl) if result_cache_size else None
+        )
+
+        self.serving_fn = None
+        self.serving_fns = {}
+        self._filter_table = str.maketrans(TOKENIZER_FILTERS, ' ' * len(TOKENIZER_FILTERS))
+
+    @classmethod
+    def load(cls, model_path='model/emotion_detection_model', preprocessor=None, use_length_buckets=False,
+             load_network=True, backend='tf', quantization='dynamic', **options):
+        """Muat artefak serving (vocabulary, config JSON dan SavedModel), compile dan warm-up.
+
+        Dengan load_network=False hanya bagian tanpa TensorFlow yang dimuat (vocabulary, config,
+        preprocessor); panggil load_network() nanti, mis. setelah fork di proses worker.
+        backend='tflite' memuat {model_path}_{quantization}.tflite dan backend='numpy' memuat
+        {model_path}_weights.npz sebagai pengganti SavedModel.
+        """
+        paths = serving_artifact_paths(model_path)
+
+        with open(paths['config'], 'r', encoding='utf-8') as f:
+            config = json.load(f)
+
+        # Baris ke-i (mulai 1) adalah kata dengan index i
+        word_index = {}
+        with open(paths['vocab'], 'r', encoding='utf-8') as f:
+            for index, line in enumerate(f, start=1):
+                word_index[line.rstrip('\n')] = index
+
+        # Preprocessor bersama (mis. milik model aktif) disalin dangkal jika setting routing-nya
+        # berbeda; Sastrawi dan stem cache tetap dipakai bersama
+        language_routing = config.get('preprocessing', {}).get('language_routing', False)
+        if preprocessor is not None and preprocessor.language_routing != language_routing:
+            preprocessor = copy.copy(preprocessor)
+        preprocessor = preprocessor or TextPreprocessor()
+        preprocessor.language_routing = language_routing
+        preprocessor.load_stem_cache(paths['stem_cache'])
+
+        predictor = cls(
+            None,
+            word_index,
+            config['classes'],
+            config['max_length'],
+            config['vocab_size'],
+            oov_index=config.get('oov_index', 1),
+            preprocessor=preprocessor,
+            use_length_buckets=use_length_buckets,
+            model_version=config.get('version') or saved_model_version(paths['model']),
+            backend=backend,
+            quantization=quantization,
+            **options
+        )
+        predictor.model_path = model_path
+        if load_network:
+            predictor.load_network()
+        return predictor
+
+    def load_network(self, model_path=None):
+        """Muat SavedModel (atau flatbuffer TFLite), compile serving function dan warm-up"""
+        model_path = model_path or self.model_path
+
+        if self.backend == 'tflite':
+            self.load_tflite(tflite_model_path(model_path, self.quantization))
+        elif self.backend == 'numpy':
+            self.load_numpy(serving_artifact_paths(model_path)['weights'])
+        else:
+            import tensorflow as tf
+
+            model_dir = serving_artifact_paths(model_path)['model']
+            self.model = tf.keras.models.load_model(model_dir, compile=False)
+            if model_path != self.model_path:
+                self.model_version = saved_model_version(model_dir)
+            self.build_serving_function()
+
+        self.model_path = model_path
+        # Hasil prediksi model sebelumnya tidak berlaku lagi
+        if self.result_cache is not None:
+            self.result_cache.clear()
+        self.warmup()
+        return self
+
+    def load_tflite(self, tflite_path):
+        """Pakai flatbuffer TFLite (input int32 [1, max_length]) untuk forward pass"""
+        self.interpreter = load_tflite_interpreter(tflite_path)
+        self.backend = 'tflite'
+        self.model_version = f'{file_version(tflite_path)}-{self.quantization}'
+        if self.result_cache is not None:
+            self.result_cache.clear()
+        return self
+
+    def load_numpy(self, weights_path, mask_padding=False):
+        """Pakai NumpyEmotionModel (lihat numpy_backend.py) untuk forward pass"""
+        from numpy_backend import NumpyEmotionModel
+
+        self.numpy_model = NumpyEmotionModel.load(weights_path, mask_padding=mask_padding)
+        self.backend = 'numpy'
+        self.model_version = f'{file_version(weights_path)}-numpy'
+        if self.result_cache is not None:
+            self.result_cache.clear()
+        return self
+
+    def preprocess_text(self, text):
+        return self.preprocessor.preprocess_text(text)
+
+    def preprocess_texts(self, texts):
+        return self.preprocessor.preprocess_texts(texts)
+
+    def texts_to_sequences(self, processed_texts):
+        """Setara Tokenizer.texts_to_sequences dengan num_words=vocab_size dan oov_token"""
+        word_index = self.word_index
+        oov_index = self.oov_index
+        return [
+            [word_index.get(word, oov_index) for word in text.lower().translate(self._filter_table).split()]
+            for text in processed_texts
+        ]
+
+    def predict_emotion(self, text):
+        """Predict emotion for a single text"""
+        return self.predict_emotions([text])[0]
+
+    def predict_emotions(self, texts, batch_size=256):
+        """Predict emotion untuk banyak teks sekaligus dalam satu forward pass per chunk"""
+        processed_texts = self.preprocess_texts(texts)
+        return self.predict_preprocessed(processed_texts, batch_size=batch_size)
+
+    def predict_emotions_table(self, texts, batch_size=256):
+        """Seperti predict_emotions, tetapi hasilnya array NumPy per kolom (lihat predict_preprocessed_table)"""
+        processed_texts = self.preprocess_texts(texts)
+        return self.predict_preprocessed_table(processed_texts, batch_size=batch_size)
+
+    def result_cache_key(self, processed_text):
+        """Key cache hasil: hash teks hasil preprocessing plus versi model"""
+        return hashlib.sha1(f'{self.model_version}\0{processed_text}'.encode('utf-8')).hexdigest()
+
+    def cached_prediction(self, processed_text):
+        """Hasil prediksi dari cache, atau None jika belum ada"""
+        if self.result_cache is None:
+            return None
+        probabilities = self.result_cache.get(self.result_cache_key(processed_text))
+        if probabilities is None:
+            return None
+        return self.results_from_probabilities(probabilities[np.newaxis, :])[0]
+
+    def predict_preprocessed(self, processed_texts, batch_size=256, use_cache=True):
+        """Predict emotion untuk teks yang sudah melalui preprocess_text (list dict per teks)"""
+        probabilities = self.predict_probability_rows(processed_texts, batch_size=batch_size, use_cache=use_cache)
+        return self.results_from_probabilities(probabilities)
+
+    def predict_preprocessed_table(self, processed_texts, batch_size=256):
+        """Hasil untuk seluruh batch sebagai array: emotions, sentiments, confidences dan
+        probabilities [n, kelas] dengan urutan kolom self.classes"""
+        probabilities = self.predict_probability_rows(processed_texts, batch_size=batch_size)
+        with metrics.stage_timer('decode'):
+            indices, confidences = self.decode(probabilities)
+            return {
+                'emotions': self._class_table[indices],
+                'sentiments': self._sentiment_table[indices],
+                'confidences': confidences,
+                'probabilities': probabilities,
+            }
+
+    def predict_probability_rows(self, processed_texts, batch_size=256, use_cache=True):
+        """Probabilitas [n, kelas] untuk teks hasil preprocess_text.
+
+        Teks yang hasilnya sudah ada di result_cache tidak ikut forward pass; teks yang sama
+        dalam satu batch hanya dihitung sekali. use_cache=False melewati lookup (mis. jika
+        pemanggil sudah memeriksa cached_prediction) tetapi hasil tetap disimpan ke cache.
+        """
+        if self.result_cache is None:
+            return self._predict_uncached(processed_texts, batch_size=batch_size)
+
+        rows = [None] * len(processed_texts)
+        if use_cache:
+            rows = [self.result_cache.get(self.result_cache_key(text)) for text in processed_texts]
+
+        pending = {}
+        for i, (text, row) in enumerate(zip(processed_texts, rows)):
+            if row is None:
+                pending.setdefault(text, []).append(i)
+
+        if pending:
+            texts = list(pending)
+            for text, row in zip(texts, self._predict_uncached(texts, batch_size=batch_size)):
+                self.result_cache.set(self.result_cache_key(text), row)
+                for i in pending[text]:
+                    rows[i] = row
+
+        if not rows:
+            return np.zeros((0, len(self.classes)), dtype=np.float32)
+        return np.stack(rows)
+
+    def _predict_uncached(self, processed_texts, batch_size=256):
+        if len(processed_texts) == 0:
+            return np.zeros((0, len(self.classes)), dtype=np.float32)
+
+        metrics.observe('ml_forward_batch_size', len(processed_texts))
+
+        # Tokenize seluruh batch sekaligus, lalu pad dan predict per chunk batch_size
+        with metrics.stage_timer('tokenize'):
+            sequences = self.texts_to_sequences(processed_texts)
+        return self.predict_sequences(sequences, batch_size=batch_size)
+
+    def decode(self, probabilities):
+        """Index kelas (argmax) dan confidence untuk seluruh batch sekaligus"""
+        indices = np.argmax(probabilities, axis=1)
+        return indices, probabilities[np.arange(len(indices)), indices]
+
+    def results_from_probabilities(self, probabilities):
+        """Ubah array probabilitas menjadi dict per teks (format predict_emotion)"""
+        with metrics.stage_timer('decode'):
+            indices, confidences = self.decode(probabilities)
+            classes = self.classes
+            sentiments = self.class_sentiments
+            return [
+                {
+                    'emotion': classes[index],
+                    'sentiment': sentiments[index],
+                    'confidence': confidence,
+                    'all_probabilities': dict(zip(classes, row)),
+                }
+                for index, confidence, row in zip(indices.tolist(), confidences.tolist(), probabilities.tolist())
+            ]
+
+    def build_serving_function(self):
+        """Compile forward pass model menjadi tf.function int32, satu signature per panjang bucket"""
+        import tensorflow as tf
+
+        model = self.model
+        lengths = [self.max_length]
+
+        if self.use_length_buckets:
+            # Sequential mengunci input shape (None, max_length); panggil layer-nya langsung
+            # (bobot yang sama) agar panjang sequence bebas
+            sequences = tf.keras.Input(shape=(None,), dtype='int32')
+            outputs = sequences
+            for layer in self.model.layers:
+                outputs = layer(outputs)
+            model = tf.keras.Model(sequences, outputs)
+            lengths = self.bucket_lengths()
+
+        self.serving_fns = {}
+        for length in lengths:
+            @tf.function(input_signature=[tf.TensorSpec(shape=[None, length], dtype=tf.int32)])
+            def serving_fn(sequences):
+                return model(sequences, training=False)
+
+            self.serving_fns[length] = serving_fn
+
+        self.serving_fn = self.serving_fns[self.max_length]
+        return self.serving_fn
+
+    def bucket_lengths(self):
+        """Panjang padding yang tersedia, selalu diakhiri max_length"""
+        lengths = [length for length in self.length_buckets if length < self.max_length]
+        return sorted(set(lengths)) + [self.max_length]
+
+    def bucket_length(self, sequence_length):
+        """Bucket terkecil yang muat untuk sequence sepanjang sequence_length"""
+        for length in self.bucket_lengths():
+            if sequence_length <= length:
+                return length
+        return self.max_length
+
+    def warmup(self, batch_sizes=(1, 32)):
+        """Jalankan serving function sekali agar tracing tidak terjadi di request pertama"""
+        if self.interpreter is not None or self.numpy_model is not None:
+            self.predict_probabilities(np.zeros((1, self.max_length), dtype=np.int32))
+            return
+
+        lengths = self.bucket_lengths() if self.use_length_buckets else [self.max_length]
+        for length in lengths:
+            for batch_size in batch_sizes:
+                self.predict_probabilities(np.zeros((batch_size, length), dtype=np.int32))
+
+    def predict_probabilities(self, padded_sequences, batch_size=256):
+        """Hitung probabilitas kelas untuk sequence yang sudah di-pad"""
+        padded_sequences = np.asarray(padded_sequences, dtype=np.int32)
+        if self.interpreter is not None:
+            return self.predict_probabilities_tflite(padded_sequences)
+        if self.numpy_model is not None:
+            return self.numpy_model.predict(padded_sequences, batch_size=batch_size)
+
+        serving_fn = self.serving_fns.get(padded_sequences.shape[1])
+
+        if serving_fn is None:
+            return self.model.predict(padded_sequences, batch_size=batch_size, verbose=0)
+
+        chunks = [
+            serving_fn(padded_sequences[start:start + batch_size]).numpy()
+            for start in range(0, len(padded_sequences), batch_size)
+        ]
+        return np.concatenate(chunks, axis=0)
+
+    def predict_probabilities_tflite(self, padded_sequences):
+        """Forward pass TFLite per baris.
+
+        Flatbuffer diekspor dengan batch tetap 1: LSTM hasil konversi tidak bisa di-resize ke
+        batch lain, dan biaya per baris sudah linear sehingga batch lebih besar tidak lebih cepat.
+        Interpreter tidak thread-safe, jadi invoke dijalankan di bawah lock.
+        """
+        interpreter = self.interpreter
+        input_index = interpreter.get_input_details()[0]['index']
+        output_index = interpreter.get_output_details()[0]['index']
+
+        outputs = []
+        with self._interpreter_lock:
+            for row in padded_sequences:
+                interpreter.set_tensor(input_index, row[np.newaxis, :])
+                interpreter.invoke()
+                outputs.append(interpreter.get_tensor(output_index)[0].copy())
+        return np.stack(outputs)
+
+    def predict_sequences(self, sequences, batch_size=256):
+        """Pad sequence token lalu predict, dengan length bucketing jika diaktifkan.
+
+        Tanpa bucketing semua sequence di-pad ke max_length persis seperti saat training.
+        Dengan bucketing, sequence dikelompokkan per bucket (16/32/64/max_length) dan
+        hanya di-pad sampai panjang bucket-nya. Model dilatih tanpa masking sehingga
+        LSTM juga memproses token padding; memotong padding mengubah probabilitas
+        sedikit. Gunakan benchmark.py --buckets untuk mengukur selisih maksimum
+        probabilitas dan kesesuaian label terhadap padding penuh sebelum mengaktifkannya.
+        """
+        # Flatbuffer TFLite hanya menerima max_length
+        if not self.use_length_buckets or self.interpreter is not None:
+            with metrics.stage_timer('pad'):
+                padded_sequences = pad_post(sequences, self.max_length)
+            with metrics.stage_timer('forward'):
+                return self.predict_probabilities(padded_sequences, batch_size=batch_size)
+
+        buckets = {}
+        for i, sequence in enumerate(sequences):
+            buckets.setdefault(self.bucket_length(len(sequence)), []).append(i)
+
+        predictions = None
+        for length, indices in buckets.items():
+            with metrics.stage_timer('pad'):
+                padded_sequences = pad_post([sequences[i] for i in indices], length)
+            with metrics.stage_timer('forward'):
+                bucket_predictions = self.predict_probabilities(padded_sequences, batch_size=batch_size)
+            if predictions is None:
+                predictions = np.zeros((len(sequences), bucket_predictions.shape[1]), dtype=bucket_predictions.dtype)
+            predictions[indices] = bucket_predictions
+
+        return predictions
@@ -0,0 +1,131 @@
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+
+def load_texts(csv_path, limit):
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        return [row['text'] for _, row in zip(range(limit), reader) if row.get('text')]
+
+
+def wait_until_ready(base_url, timeout):
+    """Tunggu sampai /ready mengembalikan 200"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'{base_url}/ready', timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def post_json(url, payload, timeout=30):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode('utf-8'), headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.status
+
+
+def run_load(base_url, texts, concurrency, duration):
+    """Kirim /predict dari `concurrency` thread selama `duration` detik"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        i = offset
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                post_json(f'{base_url}/predict', {'text': texts[i % len(texts)]})
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+            i += concurrency
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'throughput_rps': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50) * 1000) if latencies else None,
+        'p99_ms': float(np.percentile(latencies, 99) * 1000) if latencies else None,
+    }
+
+
+def start_server(workers, port, threads):
+    return subprocess.Popen(
+        [sys.executable, 'serve.py', '--workers', str(workers), '--port', str(port), '--threads', str(threads)],
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load-test /predict across different worker counts')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--port', type=int, default=5050)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--ready-timeout', type=float, default=300)
+    parser.add_argument('--data', default='data/data_indo.csv')
+    parser.add_argument('--url', default=None,
+                        help='Test an already running server instead of starting serve.py')
+    args = parser.parse_args()
+
+    texts = load_texts(args.data, 1000)
+
+    if args.url:
+        if not wait_until_ready(args.url, args.ready_timeout):
+            sys.exit(f"❌ {args.url} did not become ready")
+        print(json.dumps(run_load(args.url, texts, args.concurrency, args.duration), indent=2))
+        sys.exit(0)
+
+    results = {}
+    for workers in args.workers:
+        print(f"\n🚀 Starting serve.py with {workers} worker(s)...")
+        server = start_server(workers, args.port, args.threads)
+        base_url = f'http://127.0.0.1:{args.port}'
+        try:
+            if not wait_until_ready(base_url, args.ready_timeout):
+                print(f"❌ Server with {workers} worker(s) did not become ready")
+                continue
+            # Warm-up seluruh worker sebelum pengukuran
+            run_load(base_url, texts, args.concurrency, 2)
+            results[workers] = run_load(base_url, texts, args.concurrency, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"\n📊 Throughput on {os.cpu_count()} CPU(s), concurrency {args.concurrency}:")
+    baseline = results.get(min(results)) if results else None
+    for workers, stats in results.items():
+        scaling = stats['throughput_rps'] / baseline['throughput_rps'] if baseline['throughput_rps'] else 0.0
+        print(f"  workers={workers:<3d} {stats['throughput_rps']:8.1f} req/s  "
+              f"p50={stats['p50_ms']:.1f} ms  p99={stats['p99_ms']:.1f} ms  "
+              f"errors={stats['errors']}  x{scaling:.2f}")
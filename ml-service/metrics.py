@@ -0,0 +1,163 @@
+import bisect
+import os
+import threading
+import time
+
+# Batas bucket histogram durasi (detik) dan ukuran batch
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+def format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{format_labels(self.labelnames, labelvalues)} {format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # Per label: [jumlah per bucket (non-kumulatif, terakhir untuk +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labelvalues, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    labels = format_labels(self.labelnames, labelvalues, [('le', format_value(bound))])
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                labels = format_labels(self.labelnames, labelvalues)
+                lines.append(f'{self.name}_sum{labels} {format_value(total)}')
+                lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class _StageTimer:
+    __slots__ = ('histogram', 'stage', 'start')
+
+    def __init__(self, histogram, stage):
+        self.histogram = histogram
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.histogram.observe(time.perf_counter() - self.start, self.stage)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """Kumpulan metrik proses ini dalam format teks Prometheus.
+
+    Jika enabled=False, stage_timer mengembalikan objek no-op bersama dan observe/inc
+    langsung kembali, jadi hook di jalur prediksi hampir tanpa biaya. Dengan server
+    pre-fork setiap worker punya registry sendiri.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = {}
+        self._collectors = []
+        self.stage_duration = self.histogram(
+            'ml_stage_duration_seconds', 'Duration of each inference stage', labelnames=('stage',)
+        )
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._metrics.setdefault(name, Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DURATION_BUCKETS):
+        return self._metrics.setdefault(name, Histogram(name, help_text, labelnames, buckets))
+
+    def register_collector(self, collector):
+        """collector() -> list of (name, help, {label tuple: value}, labelnames); dipanggil saat scrape"""
+        self._collectors.append(collector)
+
+    def stage_timer(self, stage):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self.stage_duration, stage)
+
+    def observe(self, name, value, *labelvalues):
+        if self.enabled:
+            self._metrics[name].observe(value, *labelvalues)
+
+    def inc(self, name, *labelvalues, amount=1):
+        if self.enabled:
+            self._metrics[name].inc(*labelvalues, amount=amount)
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+
+        for collector in self._collectors:
+            for name, help_text, samples, labelnames in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} gauge')
+                for labelvalues, value in samples.items():
+                    lines.append(f'{name}{format_labels(labelnames, labelvalues)} {format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry(enabled=os.environ.get('METRICS_ENABLED', '1') == '1')
+registry.histogram(
+    'ml_forward_batch_size', 'Number of texts per model forward pass', buckets=SIZE_BUCKETS
+)
@@ -0,0 +1,241 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from metrics import registry as metrics
+
+# Teks Indonesia dan Inggris (pendek dan panjang) untuk warm-up sebelum model menerima traffic
+WARMUP_TEXTS = (
+    'saya senang sekali hari ini',
+    'aku merasa sedih dan kecewa karena semua rencana yang sudah disusun berantakan',
+    'i feel so happy today',
+    'im feeling rather rotten so im not very ambitious right now and i dont know why',
+)
+
+metrics.counter(
+    'ml_model_swaps_total', 'Active model changes', labelnames=('reason',)
+)
+metrics.counter(
+    'ml_shadow_predictions_total', 'Texts scored by the candidate model', labelnames=('result',)
+)
+
+
+class ModelRegistry:
+    """Versi model di proses ini: aktif, sebelumnya (untuk rollback) dan kandidat (shadow).
+
+    Model baru dimuat dan di-warm-up di background thread, lalu ditukar dengan model aktif
+    di bawah lock; request yang sedang berjalan tetap memakai objek model yang sudah mereka
+    ambil, jadi tidak ada prediksi yang terputus. Model sebelumnya tetap di memori untuk
+    rollback. Model kandidat tidak melayani response: sebagian request (shadow_percent)
+    juga di-score olehnya di thread terpisah dan hasilnya dibandingkan dengan model aktif.
+
+    Dengan server pre-fork setiap worker punya registry sendiri; pakai watch() agar semua
+    worker memuat ulang saat artefak di disk berubah.
+    """
+
+    def __init__(self, load_fn, max_pending_shadow=64):
+        self.load_fn = load_fn
+        self.max_pending_shadow = max_pending_shadow
+
+        self.active = None
+        self.previous = None
+        self.candidate = None
+        self.shadow_percent = 0.0
+
+        self._lock = threading.Lock()
+        self._loader = None
+        self._load_status = None
+        self._shadow_pool = None
+        self._shadow_pid = None
+        self._shadow_pending = 0
+        self._shadow_stats = self._empty_shadow_stats()
+
+    @staticmethod
+    def _empty_shadow_stats():
+        return {'texts': 0, 'agreed': 0, 'confidence_delta_sum': 0.0, 'dropped': 0, 'errors': 0}
+
+    def warm_up(self, model):
+        """Beberapa prediksi batch (ukuran 1 dan penuh) tanpa cache hasil"""
+        processed_texts = model.preprocess_texts(list(WARMUP_TEXTS))
+        for size in (1, len(processed_texts)):
+            model.predict_preprocessed(processed_texts[:size], use_cache=False)
+
+    def load(self, model_path, shadow_percent=None):
+        """Muat dan warm-up model, lalu jadikan aktif (atau kandidat jika shadow_percent diisi)"""
+        model = self.load_fn(model_path)
+        if model is None:
+            raise ValueError(f"Could not load model from {model_path}")
+        self.warm_up(model)
+        model.loaded_at = time.time()
+
+        if shadow_percent is None:
+            self.activate(model, reason='load')
+        else:
+            self.set_candidate(model, shadow_percent)
+        return model
+
+    def load_async(self, model_path, shadow_percent=None):
+        """Jalankan load() di background thread; progres dibaca lewat status()"""
+        with self._lock:
+            if self._loader is not None and self._loader.is_alive():
+                raise RuntimeError(f"Model {self._load_status['model_path']} is still loading")
+            self._load_status = {
+                'model_path': model_path,
+                'state': 'loading',
+                'shadow_percent': shadow_percent,
+                'started_at': time.time(),
+            }
+            self._loader = threading.Thread(
+                target=self._load_in_background, args=(model_path, shadow_percent),
+                name='model-loader', daemon=True
+            )
+            self._loader.start()
+        return dict(self._load_status)
+
+    def _load_in_background(self, model_path, shadow_percent):
+        try:
+            model = self.load(model_path, shadow_percent=shadow_percent)
+        except Exception as e:
+            print(f"❌ Error loading model {model_path}: {e}")
+            self._load_status.update(state='failed', error=str(e), finished_at=time.time())
+            return
+        self._load_status.update(state='ready', version=model.model_version, finished_at=time.time())
+        print(f"✅ Model {model.model_version} loaded from {model_path}")
+
+    def activate(self, model, reason='load'):
+        """Tukar model aktif secara atomik; model aktif lama disimpan untuk rollback"""
+        with self._lock:
+            self.previous, self.active = self.active, model
+        metrics.inc('ml_model_swaps_total', reason)
+
+    def rollback(self):
+        """Kembali ke model sebelumnya; model yang sekarang aktif menjadi 'previous'"""
+        with self._lock:
+            if self.previous is None:
+                raise ValueError('No previous model to roll back to')
+            self.active, self.previous = self.previous, self.active
+        metrics.inc('ml_model_swaps_total', 'rollback')
+        return self.active
+
+    def set_candidate(self, model, shadow_percent):
+        with self._lock:
+            self.candidate = model
+            self.shadow_percent = float(shadow_percent)
+            self._shadow_stats = self._empty_shadow_stats()
+
+    def promote(self):
+        """Jadikan kandidat sebagai model aktif dan hentikan shadow traffic"""
+        with self._lock:
+            candidate = self.candidate
+            if candidate is None:
+                raise ValueError('No candidate model to promote')
+            self.candidate, self.shadow_percent = None, 0.0
+        self.activate(candidate, reason='promote')
+        return candidate
+
+    def clear_candidate(self):
+        with self._lock:
+            self.candidate, self.shadow_percent = None, 0.0
+
+    def shadow(self, processed_texts, emotions, confidences):
+        """Score ulang sebagian request dengan model kandidat di background (tidak memengaruhi response)"""
+        candidate = self.candidate
+        if candidate is None or random.random() * 100 >= self.shadow_percent:
+            return
+
+        with self._lock:
+            if self._shadow_pending >= self.max_pending_shadow:
+                self._shadow_stats['dropped'] += len(processed_texts)
+                return
+            self._shadow_pending += 1
+            # Thread tidak ikut ter-fork: buat pool baru untuk proses ini
+            if self._shadow_pid != os.getpid():
+                self._shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shadow')
+                self._shadow_pid = os.getpid()
+        self._shadow_pool.submit(self._compare, candidate, processed_texts, emotions, confidences)
+
+    def _compare(self, candidate, processed_texts, emotions, confidences):
+        try:
+            table = candidate.predict_preprocessed_table(processed_texts)
+        except Exception as e:
+            print(f"⚠️  Shadow prediction failed: {e}")
+            with self._lock:
+                self._shadow_pending -= 1
+                self._shadow_stats['errors'] += 1
+            return
+
+        agree = table['emotions'] == np.asarray(emotions, dtype=object)
+        agreed = int(agree.sum())
+        confidence_delta = float(np.abs(table['confidences'] - np.asarray(confidences)).sum())
+        metrics.inc('ml_shadow_predictions_total', 'agree', amount=agreed)
+        metrics.inc('ml_shadow_predictions_total', 'disagree', amount=len(agree) - agreed)
+
+        with self._lock:
+            self._shadow_pending -= 1
+            # Statistik kandidat lama tidak dicampur setelah kandidat diganti
+            if candidate is self.candidate:
+                self._shadow_stats['texts'] += len(processed_texts)
+                self._shadow_stats['agreed'] += agreed
+                self._shadow_stats['confidence_delta_sum'] += confidence_delta
+
+    def watch(self, model_path, fingerprint_fn, interval):
+        """Muat ulang model_path di background setiap kali fingerprint_fn(model_path) berubah.
+
+        Perubahan baru dipakai setelah fingerprint sama selama satu interval, agar artefak
+        yang masih ditulis (mis. oleh train_model.py) tidak ikut dimuat.
+        """
+        def run():
+            last = fingerprint_fn(model_path)
+            pending = None
+            while True:
+                time.sleep(interval)
+                current = fingerprint_fn(model_path)
+                if current is None or current == last:
+                    pending = None
+                    continue
+                if current != pending:
+                    pending = current
+                    continue
+                try:
+                    self.load_async(model_path)
+                except RuntimeError:
+                    continue
+                print(f"🔁 Model artifacts at {model_path} changed, reloading")
+                last, pending = current, None
+
+        watcher = threading.Thread(target=run, name='model-watcher', daemon=True)
+        watcher.start()
+        return watcher
+
+    def describe(self, model):
+        if model is None:
+            return None
+        return {
+            'version': model.model_version,
+            'model_path': getattr(model, 'model_path', None),
+            'backend': model.backend,
+            'loaded_at': getattr(model, 'loaded_at', None),
+        }
+
+    def status(self):
+        """Versi aktif/sebelumnya/kandidat, status load terakhir dan hasil shadow"""
+        with self._lock:
+            status = {
+                'active': self.describe(self.active),
+                'previous': self.describe(self.previous),
+                'candidate': self.describe(self.candidate),
+                'loading': dict(self._load_status) if self._load_status else None,
+            }
+            if self.candidate is not None:
+                stats = dict(self._shadow_stats)
+                stats['shadow_percent'] = self.shadow_percent
+                stats['agreement'] = stats['agreed'] / stats['texts'] if stats['texts'] else None
+                stats['mean_confidence_delta'] = (
+                    stats.pop('confidence_delta_sum') / stats['texts'] if stats['texts'] else None
+                )
+                status['shadow'] = stats
+        return status
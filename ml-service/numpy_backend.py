@@ -0,0 +1,221 @@
+import argparse
+import json
+
+import numpy as np
+
+
+def sigmoid(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+def relu(x):
+    return np.maximum(x, 0.0)
+
+
+def softmax(x):
+    exp = np.exp(x - x.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': relu,
+    'sigmoid': sigmoid,
+    'tanh': np.tanh,
+    'softmax': softmax,
+}
+
+# Layer yang tidak aktif saat inferensi
+INFERENCE_NOOP_LAYERS = ('Dropout', 'SpatialDropout1D', 'InputLayer')
+
+
+def export_numpy_weights(model, weights_path):
+    """Simpan bobot model build_model (Embedding, Bidirectional LSTM, Dense) ke .npz.
+
+    Spesifikasi layer disimpan sebagai JSON di key 'layers'; bobot layer ke-i di key 'i/nama'.
+    """
+    layers = []
+    arrays = {}
+
+    for layer in model.layers:
+        name = layer.__class__.__name__
+        if name in INFERENCE_NOOP_LAYERS:
+            continue
+
+        index = len(layers)
+        if name == 'Embedding':
+            layers.append({'type': 'embedding'})
+            arrays[f'{index}/embeddings'] = layer.get_weights()[0]
+        elif name == 'Bidirectional' and layer.forward_layer.__class__.__name__ == 'LSTM':
+            lstm = layer.forward_layer
+            if lstm.activation.__name__ != 'tanh' or lstm.recurrent_activation.__name__ != 'sigmoid':
+                raise ValueError(f"Unsupported LSTM activations in layer {layer.name}")
+            if layer.merge_mode != 'concat':
+                raise ValueError(f"Unsupported merge_mode {layer.merge_mode} in layer {layer.name}")
+            layers.append({'type': 'bidirectional_lstm', 'return_sequences': lstm.return_sequences})
+            weights = layer.get_weights()
+            for direction, offset in (('forward', 0), ('backward', 3)):
+                arrays[f'{index}/{direction}_kernel'] = weights[offset]
+                arrays[f'{index}/{direction}_recurrent_kernel'] = weights[offset + 1]
+                arrays[f'{index}/{direction}_bias'] = weights[offset + 2]
+        elif name == 'Dense':
+            activation = layer.activation.__name__
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation {activation} in layer {layer.name}")
+            layers.append({'type': 'dense', 'activation': activation})
+            kernel, bias = layer.get_weights()
+            arrays[f'{index}/kernel'] = kernel
+            arrays[f'{index}/bias'] = bias
+        else:
+            raise ValueError(f"Layer {layer.name} ({name}) is not supported by the NumPy backend")
+
+    np.savez(weights_path, layers=np.array(json.dumps(layers)), **arrays)
+
+
+def lstm(inputs, mask, kernel, recurrent_kernel, bias, return_sequences, reverse=False):
+    """LSTM Keras (urutan gate i, f, c, o) atas batch [batch, time, features].
+
+    Proyeksi input untuk semua timestep dihitung dalam satu matmul; loop hanya untuk
+    bagian recurrent. Timestep yang di-mask tidak mengubah state (seperti Keras).
+    """
+    batch_size, timesteps, _ = inputs.shape
+    units = recurrent_kernel.shape[0]
+
+    projected = inputs @ kernel + bias
+    h = np.zeros((batch_size, units), dtype=inputs.dtype)
+    c = np.zeros((batch_size, units), dtype=inputs.dtype)
+    outputs = np.zeros((batch_size, timesteps, units), dtype=inputs.dtype) if return_sequences else None
+
+    steps = range(timesteps - 1, -1, -1) if reverse else range(timesteps)
+    for t in steps:
+        z = projected[:, t] + h @ recurrent_kernel
+        i = sigmoid(z[:, :units])
+        f = sigmoid(z[:, units:2 * units])
+        g = np.tanh(z[:, 2 * units:3 * units])
+        o = sigmoid(z[:, 3 * units:])
+        c_next = f * c + i * g
+        h_next = o * np.tanh(c_next)
+
+        if mask is not None:
+            step_mask = mask[:, t:t + 1]
+            c = np.where(step_mask, c_next, c)
+            h = np.where(step_mask, h_next, h)
+            if return_sequences:
+                outputs[:, t] = np.where(step_mask, h_next, 0.0)
+        else:
+            c, h = c_next, h_next
+            if return_sequences:
+                outputs[:, t] = h
+
+    return outputs if return_sequences else h
+
+
+class NumpyEmotionModel:
+    """Forward pass model build_model dengan NumPy saja (tanpa TensorFlow).
+
+    Dengan mask_padding=True token 0 (padding) dilewati oleh LSTM. Model dilatih tanpa
+    masking, jadi opsi ini mengubah probabilitas; default False untuk paritas dengan
+    model.predict.
+    """
+
+    def __init__(self, layers, weights, mask_padding=False):
+        self.layers = layers
+        self.weights = weights
+        self.mask_padding = mask_padding
+
+    @classmethod
+    def load(cls, weights_path, mask_padding=False):
+        with np.load(weights_path) as data:
+            layers = json.loads(str(data['layers']))
+            weights = {
+                key: data[key].astype(np.float32) for key in data.files if key != 'layers'
+            }
+        return cls(layers, weights, mask_padding=mask_padding)
+
+    def predict(self, padded_sequences, batch_size=256):
+        padded_sequences = np.asarray(padded_sequences)
+        chunks = [
+            self.forward(padded_sequences[start:start + batch_size])
+            for start in range(0, len(padded_sequences), batch_size)
+        ]
+        return np.concatenate(chunks, axis=0)
+
+    def forward(self, sequences):
+        mask = sequences != 0 if self.mask_padding else None
+        outputs = sequences
+
+        for index, layer in enumerate(self.layers):
+            if layer['type'] == 'embedding':
+                outputs = self.weights[f'{index}/embeddings'][outputs]
+            elif layer['type'] == 'bidirectional_lstm':
+                directions = [
+                    lstm(
+                        outputs, mask,
+                        self.weights[f'{index}/{direction}_kernel'],
+                        self.weights[f'{index}/{direction}_recurrent_kernel'],
+                        self.weights[f'{index}/{direction}_bias'],
+                        layer['return_sequences'],
+                        reverse=direction == 'backward'
+                    )
+                    for direction in ('forward', 'backward')
+                ]
+                outputs = np.concatenate(directions, axis=-1)
+            elif layer['type'] == 'dense':
+                outputs = ACTIVATIONS[layer['activation']](
+                    outputs @ self.weights[f'{index}/kernel'] + self.weights[f'{index}/bias']
+                )
+
+        return outputs
+
+
+def check_parity(model_path, num_sequences=64, tolerance=1e-4, seed=0):
+    """Bandingkan probabilitas NumPy dengan model.predict SavedModel; kembalikan selisih maksimum"""
+    import tensorflow as tf
+    from inference import pad_post, serving_artifact_paths
+
+    paths = serving_artifact_paths(model_path)
+    with open(paths['config'], 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    # Sequence acak dengan panjang bervariasi dan post-padding seperti di jalur prediksi
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(1, config['max_length'] + 1, size=num_sequences)
+    sequences = [rng.integers(1, config['vocab_size'], size=length).tolist() for length in lengths]
+    padded_sequences = pad_post(sequences, config['max_length'])
+
+    model = tf.keras.models.load_model(paths['model'], compile=False)
+    expected = model.predict(padded_sequences, verbose=0)
+    actual = NumpyEmotionModel.load(paths['weights']).predict(padded_sequences)
+
+    max_delta = float(np.abs(expected - actual).max())
+    label_agreement = float(np.mean(np.argmax(expected, axis=1) == np.argmax(actual, axis=1)))
+    return {
+        'max_abs_probability_delta': max_delta,
+        'label_agreement': label_agreement,
+        'passed': max_delta <= tolerance,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check NumPy backend parity against the TensorFlow model')
+    parser.add_argument('--model-path', default='model/emotion_detection_model')
+    parser.add_argument('--num-sequences', type=int, default=64)
+    parser.add_argument('--tolerance', type=float, default=1e-4)
+    parser.add_argument('--export', action='store_true',
+                        help='Export {model_path}_weights.npz from the SavedModel first')
+    args = parser.parse_args()
+
+    if args.export:
+        import tensorflow as tf
+        from inference import serving_artifact_paths
+
+        paths = serving_artifact_paths(args.model_path)
+        export_numpy_weights(tf.keras.models.load_model(paths['model'], compile=False), paths['weights'])
+        print(f"💾 NumPy weights exported to {paths['weights']}")
+
+    result = check_parity(args.model_path, num_sequences=args.num_sequences, tolerance=args.tolerance)
+    print(f"📊 max |Δp| = {result['max_abs_probability_delta']:.2e}, "
+          f"label agreement = {result['label_agreement'] * 100:.1f}%")
+    if not result['passed']:
+        raise SystemExit(f"❌ Parity check failed (tolerance {args.tolerance})")
+    print("✅ NumPy backend matches model.predict")
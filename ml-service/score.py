@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from train_model import EmotionDetectionModel
+
+
+def iter_input_chunks(emotion_model, input_path, chunksize, has_header=True):
+    """DataFrame per chunk dari CSV (delimiter/encoding otomatis) atau Parquet (butuh pyarrow)"""
+    if input_path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Reading Parquet requires pyarrow. Install with: pip install pyarrow")
+
+        for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from emotion_model.iter_csv_chunks(
+            input_path, has_header=has_header, names=['text'], chunksize=chunksize
+        )
+
+
+def skip_rows(chunks, rows):
+    """Lewati `rows` baris pertama (sudah di-score di run sebelumnya) tanpa preprocessing"""
+    for chunk in chunks:
+        if rows >= len(chunk):
+            rows -= len(chunk)
+            continue
+        yield chunk.iloc[rows:]
+        rows = 0
+
+
+def load_progress(progress_path, input_path):
+    if not os.path.exists(progress_path):
+        return None
+    with open(progress_path, 'r', encoding='utf-8') as f:
+        progress = json.load(f)
+    if progress.get('input') != os.path.abspath(input_path):
+        raise ValueError(f"{progress_path} belongs to a different input: {progress.get('input')}")
+    return progress
+
+
+def save_progress(progress_path, progress):
+    tmp_path = f'{progress_path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, progress_path)
+
+
+class OutputWriter:
+    """Tulis hasil per chunk ke CSV (append) atau direktori part Parquet.
+
+    Setiap chunk di-flush sebelum progress dicatat; saat resume, byte CSV setelah posisi
+    yang tercatat (chunk yang belum selesai ditulis) dipotong.
+    """
+
+    def __init__(self, output_path, progress=None):
+        self.output_path = output_path
+        self.parquet = output_path.endswith('.parquet')
+        self.position = progress['output_position'] if progress else 0
+
+        if self.parquet:
+            os.makedirs(output_path, exist_ok=True)
+            # Part setelah posisi yang tercatat berasal dari run yang terputus
+            for name in os.listdir(output_path):
+                if name.startswith('part-') and int(name[5:10]) >= self.position:
+                    os.remove(os.path.join(output_path, name))
+        elif progress:
+            with open(output_path, 'r+b') as f:
+                f.truncate(self.position)
+        else:
+            open(output_path, 'wb').close()
+
+    def write(self, frame):
+        if self.parquet:
+            frame.to_parquet(os.path.join(self.output_path, f'part-{self.position:05d}.parquet'), index=False)
+            self.position += 1
+            return self.position
+
+        with open(self.output_path, 'a', encoding='utf-8', newline='') as f:
+            frame.to_csv(f, header=self.position == 0, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+            self.position = f.tell()
+        return self.position
+
+
+def preprocessed_chunks(emotion_model, chunks, text_column, workers, executor):
+    """Preprocess chunk berikutnya di background selagi chunk sekarang di-predict"""
+    def preprocess(chunk):
+        texts = chunk[text_column].fillna('').astype(str).tolist()
+        return texts, emotion_model.preprocess_texts(texts, workers=workers, executor=executor)
+
+    with ThreadPoolExecutor(max_workers=1) as prefetch:
+        previous = None
+        for chunk in chunks:
+            if text_column not in chunk.columns:
+                raise ValueError(f"Column '{text_column}' not found. Available columns: {chunk.columns.tolist()}")
+            future = prefetch.submit(preprocess, chunk)
+            if previous is not None:
+                yield (previous[0],) + previous[1].result()
+            previous = (chunk, future)
+
+        if previous is not None:
+            yield (previous[0],) + previous[1].result()
+
+
+def score_chunk(emotion_model, chunk, texts, processed_texts, first_row, id_column=None, batch_size=256):
+    """Forward pass batch untuk teks yang tidak kosong, lalu susun DataFrame hasil"""
+    classes = emotion_model.predictor.classes
+    valid_indices = np.array([i for i, text in enumerate(texts) if text.strip()], dtype=np.int64)
+    table = emotion_model.predictor.predict_preprocessed_table(
+        [processed_texts[i] for i in valid_indices], batch_size=batch_size
+    )
+
+    emotions = np.full(len(texts), '', dtype=object)
+    confidences = np.full(len(texts), np.nan)
+    probabilities = np.full((len(texts), len(classes)), np.nan)
+    emotions[valid_indices] = table['emotions']
+    confidences[valid_indices] = table['confidences']
+    probabilities[valid_indices] = table['probabilities']
+
+    frame = pd.DataFrame({'row': np.arange(first_row, first_row + len(texts))})
+    if id_column:
+        frame[id_column] = chunk[id_column].to_numpy()
+    frame['emotion'] = emotions
+    frame['confidence'] = confidences
+    for j, label in enumerate(classes):
+        frame[f'prob_{label}'] = probabilities[:, j]
+    return frame
+
+
+def score_file(emotion_model, input_path, output_path, text_column='text', id_column=None, has_header=True,
+               chunksize=10000, batch_size=256, workers=1, resume=False):
+    """Score seluruh file per chunk; progress dicatat di {output_path}.progress.json"""
+    progress_path = f'{output_path}.progress.json'
+    progress = load_progress(progress_path, input_path) if resume else None
+    if not resume and os.path.exists(progress_path):
+        os.remove(progress_path)
+    rows_done = progress['rows_done'] if progress else 0
+    if progress:
+        print(f"🔁 Resuming after {rows_done} rows")
+
+    writer = OutputWriter(output_path, progress)
+    chunks = skip_rows(iter_input_chunks(emotion_model, input_path, chunksize, has_header), rows_done)
+
+    executor = emotion_model.create_preprocess_pool(workers) if workers > 1 else None
+    started = time.perf_counter()
+    rows_scored = 0
+    try:
+        for chunk, texts, processed_texts in preprocessed_chunks(
+            emotion_model, chunks, text_column, workers, executor
+        ):
+            frame = score_chunk(
+                emotion_model, chunk, texts, processed_texts, rows_done,
+                id_column=id_column, batch_size=batch_size
+            )
+            output_position = writer.write(frame)
+            rows_done += len(frame)
+            rows_scored += len(frame)
+            save_progress(progress_path, {
+                'input': os.path.abspath(input_path),
+                'rows_done': rows_done,
+                'output_position': output_position,
+            })
+
+            elapsed = time.perf_counter() - started
+            print(f"✅ {rows_done} rows scored ({rows_scored / elapsed:.1f} rows/s)")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    elapsed = time.perf_counter() - started
+    print(f"\n🎉 Scored {rows_scored} rows in {elapsed:.1f}s "
+          f"({rows_scored / elapsed if elapsed else 0.0:.1f} rows/s) -> {output_path}")
+    return rows_done
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Score a CSV/Parquet file with the emotion model')
+    parser.add_argument('input', help='Input .csv or .parquet file')
+    parser.add_argument('output', help='Output .csv file, or .parquet directory of part files')
+    parser.add_argument('--model-path', default='model/emotion_detection_model')
+    parser.add_argument('--backend', choices=['tf', 'tflite', 'numpy'], default='tf')
+    parser.add_argument('--text-column', default='text')
+    parser.add_argument('--id-column', default=None, help='Column copied to the output alongside the row number')
+    parser.add_argument('--no-header', action='store_true', help='CSV without header (single text column)')
+    parser.add_argument('--chunksize', type=int, default=10000)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--workers', type=int, default=1, help='Processes used for preprocessing')
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted run')
+    args = parser.parse_args()
+
+    emotion_model = EmotionDetectionModel()
+    emotion_model.backend = args.backend
+    emotion_model.load_model(args.model_path)
+
+    score_file(
+        emotion_model,
+        args.input,
+        args.output,
+        text_column=args.text_column,
+        id_column=args.id_column,
+        has_header=not args.no_header,
+        chunksize=args.chunksize,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        resume=args.resume
+    )
@@ -0,0 +1,103 @@
+import argparse
+import os
+import threading
+
+from gunicorn.app.base import BaseApplication
+
+
+def default_intra_op_threads(workers):
+    """Bagi core CPU rata ke setiap worker agar thread TensorFlow tidak oversubscribe"""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def configure_tf_threads(intra_op_threads, inter_op_threads):
+    """Set jumlah thread TensorFlow; harus dipanggil sebelum runtime TensorFlow dipakai"""
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+
+def warm_up_worker():
+    """Muat SavedModel dan warm-up di background; /ready bernilai true setelah selesai"""
+    import app
+
+    try:
+        app.get_sentiment_model()
+    except Exception as e:
+        print(f"❌ Error loading model: {e}")
+
+
+class EmotionServiceApplication(BaseApplication):
+    """Server pre-fork (gunicorn) untuk ML service.
+
+    Proses master memuat vocabulary, config dan preprocessor (Sastrawi + stem cache) sebelum
+    fork sehingga halaman memori tersebut dibagi copy-on-write antar worker. Runtime
+    TensorFlow tidak aman di-fork, jadi SavedModel dimuat di setiap worker setelah fork
+    dengan jumlah thread intra/inter-op yang dipatok.
+    """
+
+    def __init__(self, options, intra_op_threads, inter_op_threads):
+        self.options = options
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+        intra_op_threads = self.intra_op_threads
+        inter_op_threads = self.inter_op_threads
+
+        def post_fork(server, worker):
+            import app
+
+            # Backend numpy tidak memakai TensorFlow; jangan import hanya untuk set thread
+            if app.MODEL_BACKEND == 'numpy':
+                return
+            configure_tf_threads(intra_op_threads, inter_op_threads)
+            server.log.info(
+                f"Worker {worker.pid}: TF intra-op threads={intra_op_threads}, inter-op threads={inter_op_threads}"
+            )
+
+        def post_worker_init(worker):
+            threading.Thread(target=warm_up_worker, name='model-warmup', daemon=True).start()
+
+        self.cfg.set('post_fork', post_fork)
+        self.cfg.set('post_worker_init', post_worker_init)
+
+    def load(self):
+        import app
+
+        if app.preload_artifacts() is None:
+            print("⚠️ Serving artifacts not found; each worker will load the model itself.")
+        return app.app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the ML service with pre-forked workers')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', 2)))
+    parser.add_argument('--threads', type=int, default=8,
+                        help='Request threads per worker (concurrent /predict calls are micro-batched)')
+    parser.add_argument('--intra-op-threads', type=int, default=None)
+    parser.add_argument('--inter-op-threads', type=int, default=1)
+    parser.add_argument('--timeout', type=int, default=120)
+    args = parser.parse_args()
+
+    options = {
+        'bind': f'{args.host}:{args.port}',
+        'workers': args.workers,
+        'worker_class': 'gthread',
+        'threads': args.threads,
+        'preload_app': True,
+        'timeout': args.timeout,
+    }
+
+    EmotionServiceApplication(
+        options,
+        intra_op_threads=args.intra_op_threads or default_intra_op_threads(args.workers),
+        inter_op_threads=args.inter_op_threads
+    ).run()
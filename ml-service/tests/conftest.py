@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul ml-service berada di direktori induk (layout flat, tanpa package)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
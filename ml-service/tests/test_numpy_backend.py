@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+from inference import pad_post
+from numpy_backend import NumpyEmotionModel, export_numpy_weights
+from train_model import EmotionDetectionModel
+
+VOCAB_SIZE = 40
+MAX_LENGTH = 12
+NUM_CLASSES = 6
+
+
+def build_tiny_model(fast, seed=0):
+    """Jaringan build_model kecil dengan bobot acak yang cukup besar agar probabilitas tidak seragam"""
+    trainer = EmotionDetectionModel()
+    trainer.vocab_size = VOCAB_SIZE
+    trainer.max_length = MAX_LENGTH
+    model = trainer.build_model(NUM_CLASSES, fast=fast)
+    model.build((None, MAX_LENGTH))
+
+    rng = np.random.default_rng(seed)
+    model.set_weights([rng.normal(0.0, 0.5, size=w.shape).astype(np.float32) for w in model.get_weights()])
+    return model
+
+
+def masked_copy(model):
+    """Model yang sama dengan Embedding(mask_zero=True): referensi Keras untuk mask_padding=True"""
+    config = model.get_config()
+    for layer in config['layers']:
+        if layer['class_name'] == 'Embedding':
+            layer['config']['mask_zero'] = True
+    masked = tf.keras.Sequential.from_config(config)
+    masked.build((None, MAX_LENGTH))
+    masked.set_weights(model.get_weights())
+    return masked
+
+
+def padded_batch(seed=1, num_sequences=16):
+    """Sequence dengan panjang bervariasi (termasuk penuh) dan post-padding seperti di jalur prediksi"""
+    rng = np.random.default_rng(seed)
+    lengths = list(rng.integers(1, MAX_LENGTH, size=num_sequences - 1)) + [MAX_LENGTH]
+    sequences = [rng.integers(1, VOCAB_SIZE, size=length).tolist() for length in lengths]
+    return pad_post(sequences, MAX_LENGTH)
+
+
+@pytest.mark.parametrize('fast', [False, True])
+@pytest.mark.parametrize('mask_padding', [False, True])
+def test_numpy_backend_matches_model_predict(tmp_path, fast, mask_padding):
+    model = build_tiny_model(fast)
+    weights_path = str(tmp_path / 'weights.npz')
+    export_numpy_weights(model, weights_path)
+
+    padded_sequences = padded_batch()
+    reference = masked_copy(model) if mask_padding else model
+    expected = reference.predict(padded_sequences, verbose=0)
+    actual = NumpyEmotionModel.load(weights_path, mask_padding=mask_padding).predict(padded_sequences)
+
+    assert actual.shape == (len(padded_sequences), NUM_CLASSES)
+    assert np.allclose(actual, expected, atol=1e-5, rtol=1e-4)
+
+
+def test_masking_changes_padded_predictions(tmp_path):
+    """Pastikan kedua kasus parity benar-benar berbeda (padding memengaruhi model tanpa mask)"""
+    model = build_tiny_model(fast=False)
+    weights_path = str(tmp_path / 'weights.npz')
+    export_numpy_weights(model, weights_path)
+
+    padded_sequences = padded_batch()
+    unmasked = NumpyEmotionModel.load(weights_path).predict(padded_sequences)
+    masked = NumpyEmotionModel.load(weights_path, mask_padding=True).predict(padded_sequences)
+    assert not np.allclose(unmasked, masked, atol=1e-5)
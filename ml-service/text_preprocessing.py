@@ -0,0 +1,198 @@
+import os
+import re
+
+from caching import LRUCache
+from metrics import registry as metrics
+
+# Naikkan setiap kali output preprocess_text berubah agar cache korpus lama tidak dipakai
+PREPROCESS_VERSION = 1
+
+# Mention, hashtag, URL dan karakter selain huruf (termasuk huruf Latin beraksen) dalam satu pass.
+# Setara dua re.sub berurutan: alternatif pertama hanya bergantung pada posisi awal match, dan
+# karakter yang dibuang kelas terakhir juga akan dibuang oleh re.sub kedua.
+NORMALIZE_PATTERN = re.compile(r'@\w+|#\w+|http\S+|www\S+|[^a-zA-Z\s\u00C0-\u017F]')
+
+# Kata fungsi yang sering muncul per bahasa, untuk deteksi bahasa (token sudah dinormalisasi,
+# jadi apostrof hilang: "i'm" -> "im"). Kedua set tidak boleh beririsan.
+ENGLISH_STOPWORDS = frozenset((
+    'i', 'im', 'ive', 'id', 'ill', 'me', 'my', 'myself', 'we', 'our', 'you', 'your', 'youre', 'he', 'she',
+    'him', 'her', 'his', 'it', 'its', 'they', 'them', 'their', 'the', 'a', 'an', 'and', 'or', 'but', 'if',
+    'so', 'because', 'as', 'of', 'at', 'by', 'for', 'with', 'about', 'to', 'from', 'in', 'on', 'into',
+    'up', 'out', 'over', 'than', 'then', 'too', 'very', 'just', 'not', 'no', 'dont', 'didnt', 'cant',
+    'wont', 'isnt', 'wasnt', 'am', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had',
+    'do', 'does', 'did', 'will', 'would', 'can', 'could', 'should', 'this', 'that', 'these', 'those',
+    'what', 'which', 'who', 'when', 'where', 'why', 'how', 'all', 'some', 'more', 'most', 'really',
+    'feel', 'feeling', 'like', 'still', 'there', 'here', 'now', 'get', 'got', 'know',
+))
+INDONESIAN_STOPWORDS = frozenset((
+    'saya', 'aku', 'ku', 'kamu', 'anda', 'dia', 'ia', 'kami', 'kita', 'mereka', 'yang', 'dan', 'atau',
+    'tapi', 'tetapi', 'karena', 'jadi', 'jika', 'kalau', 'di', 'ke', 'dari', 'dengan', 'untuk', 'pada',
+    'dalam', 'oleh', 'tentang', 'ini', 'itu', 'tidak', 'tak', 'bukan', 'belum', 'sudah', 'telah', 'akan',
+    'sedang', 'masih', 'bisa', 'dapat', 'harus', 'ingin', 'mau', 'ada', 'adalah', 'juga', 'hanya', 'saja',
+    'lagi', 'sangat', 'sekali', 'agak', 'terlalu', 'lebih', 'seperti', 'ketika', 'saat', 'bahwa', 'semua',
+    'banyak', 'sedikit', 'sekarang', 'begitu', 'merasa', 'perasaan', 'apa', 'bagaimana', 'mengapa',
+    'kenapa', 'sebuah', 'seorang', 'para', 'nya', 'pun', 'lah', 'kah', 'dulu', 'setelah', 'sebelum',
+))
+
+# Kode bahasa hasil detect_language; hanya teks 'id' yang melalui stopword removal dan stemming
+LANGUAGES = ('id', 'en')
+
+
+def detect_language(tokens):
+    """'en' jika token lebih banyak cocok dengan stopword Inggris daripada Indonesia, selain itu 'id'.
+
+    Cukup satu lookup set per token. Teks tanpa stopword sama sekali (mis. satu kata) dianggap
+    Indonesia, sama dengan perilaku tanpa routing.
+    """
+    english = indonesian = 0
+    for word in tokens:
+        if word in ENGLISH_STOPWORDS:
+            english += 1
+        elif word in INDONESIAN_STOPWORDS:
+            indonesian += 1
+    return 'en' if english > indonesian else 'id'
+
+
+def remove_stopwords(words, stopwords):
+    """Sama persis dengan StopWordRemover.remove Sastrawi, tetapi lookup lewat set.
+
+    Sastrawi menghapus dari list yang sedang di-iterasi, sehingga kata setelah stopword
+    dilewati (mis. dua stopword berurutan, yang kedua tetap ada). Perilaku itu dipertahankan
+    agar output sama dengan model yang sudah dilatih.
+    """
+    for word in words:
+        if word in stopwords:
+            words.remove(word)
+    return words
+
+
+class TextPreprocessor:
+    """Preprocessing teks (regex, stopword dan stemming Sastrawi) tanpa dependensi training"""
+
+    def __init__(self, stem_cache_size=200000, language_routing=False):
+        # Jika aktif, teks yang terdeteksi berbahasa Inggris tidak melalui Sastrawi. Default
+        # nonaktif agar model lama (dilatih dengan Sastrawi untuk semua teks) tetap konsisten.
+        self.language_routing = language_routing
+
+        # Indonesian preprocessing - dengan fallback yang lebih baik
+        self.stemmer_id = None
+        self.stopword_remover_id = None
+        self.stopwords = frozenset()
+
+        # Cache stem per kata; bisa disimpan di samping artefak model dan dipakai ulang
+        self.stem_cache = LRUCache(maxsize=stem_cache_size)
+
+        try:
+            from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+            from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
+            stemmer = StemmerFactory().create_stemmer()
+            # Lewati ArrayCache bawaan Sastrawi yang tidak terbatas; caching lewat stem_cache
+            self.stemmer_id = getattr(stemmer, 'delegatedStemmer', stemmer)
+            self.stopword_remover_id = StopWordRemoverFactory().create_stop_word_remover()
+            self.stopwords = frozenset(self.stopword_remover_id.get_dictionary().words)
+            print("✅ Sastrawi loaded successfully")
+        except ImportError:
+            print("⚠️  Warning: Sastrawi not available. Install with: pip install Sastrawi")
+        except Exception as e:
+            print(f"⚠️  Warning: Could not initialize Sastrawi: {e}")
+
+    def settings(self):
+        """Setting yang memengaruhi output preprocess_text"""
+        return {
+            'preprocess_version': PREPROCESS_VERSION,
+            'sastrawi': bool(self.stopword_remover_id and self.stemmer_id),
+            'language_routing': self.language_routing,
+        }
+
+    def preprocess_text(self, text):
+        """Preprocessing untuk teks dengan fallback untuk Sastrawi"""
+        return self.preprocess_texts([text])[0]
+
+    def preprocess_texts(self, texts):
+        """Preprocess banyak teks sekaligus; output sama dengan preprocess_text per teks.
+
+        Normalisasi (lowercase + satu regex terkompilasi) menghasilkan token, lalu token yang
+        sama langsung difilter stopword dan di-stem tanpa join/split ulang di antaranya.
+        Dengan language_routing, hanya teks yang terdeteksi 'id' yang melalui Sastrawi.
+        """
+        with metrics.stage_timer('normalize'):
+            token_lists = [self.normalize_tokens(text) for text in texts]
+
+        # Indonesian preprocessing if available
+        if self.stopword_remover_id and self.stemmer_id:
+            if self.language_routing:
+                with metrics.stage_timer('language'):
+                    indices = [i for i, tokens in enumerate(token_lists) if detect_language(tokens) == 'id']
+            else:
+                indices = range(len(token_lists))
+
+            with metrics.stage_timer('sastrawi'):
+                stemmed = self.stem_token_lists(
+                    [remove_stopwords(token_lists[i], self.stopwords) for i in indices]
+                )
+            for i, tokens in zip(indices, stemmed):
+                token_lists[i] = tokens
+
+        return [' '.join(tokens) for tokens in token_lists]
+
+    def detect_languages(self, texts):
+        """Bahasa ('id' atau 'en') per teks, seperti yang dipakai routing di preprocess_texts"""
+        return [detect_language(self.normalize_tokens(text)) for text in texts]
+
+    def normalize_tokens(self, text):
+        """Lowercase, buang mention/hashtag/URL/karakter khusus, lalu split per spasi"""
+        if not text:
+            return []
+        return NORMALIZE_PATTERN.sub('', str(text).lower()).split()
+
+    def stem_token_lists(self, token_lists):
+        """Stem token seluruh batch; setiap kata unik dicari sekali di stem_cache dan hanya
+        kata baru yang dijalankan ke stemmer Sastrawi"""
+        words = dict.fromkeys(word for tokens in token_lists for word in tokens)
+        stems = self.stem_cache.get_many(words)
+        for word in words:
+            if word in stems:
+                continue
+            try:
+                stem = self.stemmer_id.stem(word)
+            except Exception as e:
+                print(f"⚠️  Sastrawi processing failed: {e}")
+                stems[word] = None
+                continue
+            self.stem_cache.set(word, stem)
+            stems[word] = stem
+
+        # Stem bisa kosong atau berisi spasi (TextNormalizer Sastrawi membuang huruf beraksen)
+        stem_tokens = {word: stem.split() if stem is not None else None for word, stem in stems.items()}
+        results = []
+        for tokens in token_lists:
+            stemmed = []
+            for word in tokens:
+                parts = stem_tokens[word]
+                if parts is None:
+                    # Seperti sebelumnya: jika stemming gagal, teks dipakai tanpa stemming
+                    stemmed = tokens
+                    break
+                stemmed.extend(parts)
+            results.append(stemmed)
+        return results
+
+    def load_stem_cache(self, cache_path):
+        """Muat stem cache dari disk jika ada"""
+        if not os.path.exists(cache_path):
+            return 0
+
+        try:
+            count = self.stem_cache.load(cache_path)
+            print(f"✅ Loaded {count} cached stems from {cache_path}")
+            return count
+        except Exception as e:
+            print(f"⚠️  Could not load stem cache: {e}")
+            return 0
+
+    def save_stem_cache(self, cache_path):
+        """Simpan stem cache ke disk"""
+        self.stem_cache.save(cache_path)
+        stats = self.stem_cache.stats()
+        print(f"💾 Stem cache saved: {stats['size']} words "
+              f"(hits: {stats['hits']}, misses: {stats['misses']}, hit rate: {stats['hit_rate'] * 100:.1f}%)")
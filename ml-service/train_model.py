@@ -2,65 +2,179 @@ import pandas as pd
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Embedding, LSTM, Dropout, Bidirectional
+from tensorflow.keras.layers import Dense, Embedding, LSTM, Dropout, Bidirectional, SpatialDropout1D
 from tensorflow.keras.preprocessing.text import Tokenizer
 from tensorflow.keras.preprocessing.sequence import pad_sequences
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
+from caching import LRUCache
+from text_preprocessing import TextPreprocessor
+from inference import (
+    EMOTION_LABELS, EmotionPredictor, saved_model_version, serving_artifact_paths, tflite_model_path,
+    write_serving_artifacts
+)
+from numpy_backend import export_numpy_weights
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+import threading
+import argparse
+import hashlib
 import pickle
-import re
+import glob
+import json
+import codecs
+import shutil
+import tempfile
+import math
+import time
 import os
 
+# Batch size dan learning rate konfigurasi standar; mode cepat memakai batch lebih besar
+# dengan learning rate diskalakan akar kuadrat rasio batch (Adam)
+BASE_BATCH_SIZE = 64
+BASE_LEARNING_RATE = 0.001
+FAST_BATCH_SIZE = 256
+
+# Fine-tuning inkremental: learning rate kecil agar bobot lama tidak banyak bergeser
+FINE_TUNE_LEARNING_RATE = 0.0001
+
+# Spool training streaming: baris per file shard dan jumlah shard yang dibaca bergantian
+SPOOL_SHARD_SIZE = 5000
+SPOOL_INTERLEAVE = 8
+
+# Preprocessor per proses worker untuk preprocessing paralel (lihat preprocess_texts)
+_worker_preprocessor = None
+
+
+def scaled_learning_rate(batch_size):
+    return BASE_LEARNING_RATE * math.sqrt(batch_size / BASE_BATCH_SIZE)
+
+
+def cpu_supports_bfloat16():
+    """True jika CPU punya instruksi bfloat16 (AVX512_BF16 atau AMX); hanya dicek di Linux"""
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            flags = f.read().split()
+    except OSError:
+        return False
+    return 'avx512_bf16' in flags or 'amx_bf16' in flags
+
+
+def float32_copy(model):
+    """Salinan model dengan dtype policy float32 (untuk disimpan/di-serve setelah training bfloat16)"""
+    def float32_layer(layer):
+        config = layer.get_config()
+        config['dtype'] = 'float32'
+        if isinstance(layer, Bidirectional):
+            config['layer']['config']['dtype'] = 'float32'
+        return layer.__class__.from_config(config)
+    
+    copy = tf.keras.models.clone_model(model, clone_function=float32_layer)
+    copy.set_weights(model.get_weights())
+    copy.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+    return copy
+
+
+class EpochTimer(tf.keras.callbacks.Callback):
+    """Catat durasi wall-clock setiap epoch"""
+    
+    def __init__(self):
+        super().__init__()
+        self.timings = []
+    
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+    
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self._start
+        self.timings.append(elapsed)
+        print(f"⏱️  Epoch {epoch + 1}: {elapsed:.1f}s")
+
+
+class ShardedSpoolWriter:
+    """Tulis baris spool berurutan ke file shard berisi shard_size baris ({prefix}-00000.tsv, ...)"""
+    
+    def __init__(self, directory, prefix, shard_size=SPOOL_SHARD_SIZE):
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.paths = []
+        self._file = None
+        self._lines = 0
+    
+    def write(self, line):
+        if self._file is None or self._lines >= self.shard_size:
+            self.close()
+            path = os.path.join(self.directory, f'{self.prefix}-{len(self.paths):05d}.tsv')
+            self._file = open(path, 'w', encoding='utf-8')
+            self.paths.append(path)
+            self._lines = 0
+        self._file.write(line)
+        self._lines += 1
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+def _init_preprocess_worker(stem_entries, language_routing):
+    global _worker_preprocessor
+    _worker_preprocessor = TextPreprocessor(language_routing=language_routing)
+    _worker_preprocessor.stem_cache = LRUCache(maxsize=_worker_preprocessor.stem_cache.maxsize, track_new=True)
+    for word, stem in stem_entries:
+        _worker_preprocessor.stem_cache.set(word, stem)
+    _worker_preprocessor.stem_cache.drain_new()
+
+
+def _preprocess_chunk(texts):
+    processed_texts = _worker_preprocessor.preprocess_texts(texts)
+    # Kirim balik stem baru agar stem cache proses utama ikut terisi
+    return processed_texts, _worker_preprocessor.stem_cache.drain_new()
+
+
 class EmotionDetectionModel:
     def __init__(self):
         self.tokenizer = None
         self.model = None
+        self.predictor = None
         self.label_encoder = None
         self.max_length = 150
         self.vocab_size = 15000
         
-        # Indonesian preprocessing - dengan fallback yang lebih baik
-        self.stemmer_id = None
-        self.stopword_remover_id = None
+        # Length bucketing untuk inferensi: pad ke bucket terkecil yang cukup, bukan selalu max_length
+        self.length_buckets = (16, 32, 64)
+        self.use_length_buckets = False
         
-        try:
-            from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
-            from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
-            self.stemmer_id = StemmerFactory().create_stemmer()
-            self.stopword_remover_id = StopWordRemoverFactory().create_stop_word_remover()
-            print("✅ Sastrawi loaded successfully")
-        except ImportError:
-            print("⚠️  Warning: Sastrawi not available. Install with: pip install Sastrawi")
-        except Exception as e:
-            print(f"⚠️  Warning: Could not initialize Sastrawi: {e}")
+        # Backend inferensi setelah load_model: 'tf' (SavedModel), 'tflite' (hasil export_tflite)
+        # atau 'numpy' (bobot .npz dari export_serving_artifacts)
+        self.backend = 'tf'
+        self.tflite_quantization = 'dynamic'
+        
+        # Preprocessing teks (Sastrawi + stem cache), dipakai bersama oleh jalur inferensi
+        self.preprocessor = TextPreprocessor()
+        
+        # Cache korpus hasil preprocessing (.npz per dataset); None untuk menonaktifkan
+        self.corpus_cache_dir = 'cache/corpus'
+        
+        # Durasi per tahap training (parse, preprocess, tokenize, fit) dalam detik
+        self.stage_timings = {}
+        # Durasi wall-clock per epoch dari fit terakhir
+        self.epoch_timings = []
+        self._stage_lock = threading.Lock()
 
     def standardize_emotion_labels(self, labels):
         """Standardize berbagai format label emosi"""
-        emotion_mapping = {
-            'kesedihan': 0,
-            'kegembiraan': 1, 
-            'kemarahan': 2,
-            'ketakutan': 3,
-            'cinta': 4,
-            'kejutan': 5,
-            'sadness': 0,
-            'joy': 1,
-            'anger': 2,
-            'fear': 3,
-            'love': 4,
-            'surprise': 5,
-            '0': 0,
-            '1': 1, 
-            '2': 2,
-            '3': 3,
-            '4': 4,
-            '5': 5
-        }
-        
         standardized = []
         for label in labels:
             label_str = str(label).lower().strip()
-            standardized_label = emotion_mapping.get(label_str, label_str)
+            standardized_label = EMOTION_LABELS.get(label_str, label_str)
             standardized.append(standardized_label)
         
         return standardized
@@ -93,10 +207,138 @@ class EmotionDetectionModel:
             print(f"⚠️  Could not detect delimiter: {e}. Using comma as default")
             return ','
 
-    def load_emotion_dataset(self, csv_path, text_column=None, emotion_column=None, has_header=True):
+    @contextmanager
+    def timed_stage(self, stage):
+        """Akumulasi durasi blok ke stage_timings[stage]"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._stage_lock:
+                self.stage_timings[stage] = self.stage_timings.get(stage, 0.0) + elapsed
+
+    def print_stage_timings(self):
+        """Tampilkan durasi per tahap training"""
+        # parse dan preprocess dijumlahkan per dataset (bisa melebihi wall-clock jika paralel)
+        print("\n⏱️  Stage timings:")
+        for stage, seconds in self.stage_timings.items():
+            print(f"  {stage}: {seconds:.2f}s")
+
+    def load_emotion_dataset(self, csv_path, text_column=None, emotion_column=None, has_header=True,
+                             workers=1, executor=None):
         """Load dataset emosi dengan deteksi delimiter otomatis"""
         print(f"\n📁 Loading emotion dataset: {csv_path}")
         
+        cache_path = self.corpus_cache_path(csv_path, text_column, emotion_column, has_header)
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with self.timed_stage('parse'):
+                    texts, emotions = self.load_corpus_cache(cache_path)
+                print(f"⚡ Loaded {len(texts)} preprocessed samples from cache: {cache_path}")
+                return texts, emotions
+            except Exception as e:
+                print(f"⚠️  Could not read corpus cache {cache_path}: {e}")
+        
+        with self.timed_stage('parse'):
+            texts, emotions = self._parse_emotion_csv(csv_path, text_column, emotion_column, has_header)
+        
+        # Standardize emotions
+        standardized_emotions = self.standardize_emotion_labels(emotions)
+        
+        # Filter valid data
+        candidate_texts = []
+        candidate_emotions = []
+        
+        for text, emotion in zip(texts, standardized_emotions):
+            if (len(str(text).strip()) > 3 and 
+                str(emotion).lower() not in ['nan', 'none', '', 'null']):
+                candidate_texts.append(text)
+                candidate_emotions.append(emotion)
+        
+        with self.timed_stage('preprocess'):
+            processed_texts = self.preprocess_texts(candidate_texts, workers=workers, executor=executor)
+        
+        filtered_texts = []
+        filtered_emotions = []
+        
+        for processed_text, emotion in zip(processed_texts, candidate_emotions):
+            if len(processed_text.strip()) > 1:
+                filtered_texts.append(processed_text)
+                filtered_emotions.append(emotion)
+        
+        print(f"✅ Filtered dataset: {len(filtered_texts)} samples")
+        
+        # Show sample data
+        print("\n📋 Sample data:")
+        for i in range(min(3, len(filtered_texts))):
+            print(f"  Text: {filtered_texts[i][:50]}...")
+            print(f"  Emotion: {filtered_emotions[i]}")
+            print()
+        
+        if cache_path:
+            try:
+                self.save_corpus_cache(cache_path, filtered_texts, filtered_emotions)
+            except Exception as e:
+                print(f"⚠️  Could not write corpus cache {cache_path}: {e}")
+        
+        return filtered_texts, filtered_emotions
+
+    def preprocessing_settings(self):
+        """Setting yang memengaruhi output preprocess_text (bagian dari key cache korpus)"""
+        return self.preprocessor.settings()
+
+    def corpus_cache_path(self, csv_path, text_column, emotion_column, has_header):
+        """Path cache korpus untuk dataset ini, dikunci dengan hash isi file dan setting preprocessing"""
+        if not self.corpus_cache_dir:
+            return None
+        
+        settings = dict(self.preprocessing_settings(), text_column=text_column,
+                        emotion_column=emotion_column, has_header=has_header)
+        settings_hash = hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+        
+        content_hash = hashlib.sha256()
+        with open(csv_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                content_hash.update(block)
+        
+        # Hash path absolut: dataset dengan nama file sama di direktori lain punya entry sendiri
+        dataset_name = os.path.splitext(os.path.basename(csv_path))[0]
+        path_hash = hashlib.sha256(os.path.abspath(csv_path).encode('utf-8')).hexdigest()
+        return os.path.join(
+            self.corpus_cache_dir,
+            f'{dataset_name}-{path_hash[:8]}-{settings_hash[:8]}-{content_hash.hexdigest()[:16]}.npz'
+        )
+
+    def load_corpus_cache(self, cache_path):
+        """Baca teks hasil preprocessing dan label dari cache korpus"""
+        with np.load(cache_path) as data:
+            texts = data['texts'].tolist()
+            emotions = self.standardize_emotion_labels(data['emotions'].tolist())
+        return texts, emotions
+
+    def save_corpus_cache(self, cache_path, texts, emotions):
+        """Simpan korpus hasil preprocessing; entry lama untuk dataset dan setting yang sama dihapus"""
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        
+        # Nama file: <dataset>-<path hash>-<settings hash>-<content hash>.npz; file .tmp.npz
+        # milik penulis lain yang sedang berjalan tidak ikut dihapus
+        stale_pattern = glob.escape(cache_path.rsplit('-', 1)[0]) + '-*.npz'
+        for stale_path in glob.glob(stale_pattern):
+            if stale_path != cache_path and not stale_path.endswith('.tmp.npz'):
+                os.remove(stale_path)
+        
+        tmp_path = f'{cache_path[:-len(".npz")]}.tmp.npz'
+        np.savez_compressed(
+            tmp_path,
+            texts=np.array(texts, dtype=str),
+            emotions=np.array([str(emotion) for emotion in emotions], dtype=str)
+        )
+        os.replace(tmp_path, cache_path)
+        print(f"💾 Corpus cache saved: {cache_path}")
+
+    def _parse_emotion_csv(self, csv_path, text_column, emotion_column, has_header):
+        """Baca CSV (delimiter dan encoding otomatis) dan ambil kolom teks dan emosi"""
         # Deteksi delimiter
         delimiter = self.detect_delimiter(csv_path)
         
@@ -157,61 +399,133 @@ class EmotionDetectionModel:
         texts = df[text_column].astype(str).tolist()
         emotions = df[emotion_column].astype(str).tolist()
         
-        # Standardize emotions
-        standardized_emotions = self.standardize_emotion_labels(emotions)
+        return texts, emotions
+
+    def detect_encoding(self, csv_path, encodings=('utf-8', 'latin-1', 'cp1252', 'iso-8859-1')):
+        """Cari encoding pertama yang bisa decode seluruh file, dibaca per blok (memori konstan)"""
+        for encoding in encodings:
+            decoder = codecs.getincrementaldecoder(encoding)()
+            try:
+                with open(csv_path, 'rb') as f:
+                    for block in iter(lambda: f.read(1 << 20), b''):
+                        decoder.decode(block)
+                    decoder.decode(b'', final=True)
+                return encoding
+            except UnicodeDecodeError:
+                print(f"❌ Failed with encoding: {encoding}")
+                continue
         
-        # Filter valid data
-        filtered_texts = []
-        filtered_emotions = []
+        raise ValueError("Could not decode the dataset with any encoding")
+
+    def iter_csv_chunks(self, csv_path, has_header=True, names=None, chunksize=10000):
+        """Baca CSV per chunk DataFrame dengan delimiter dan encoding otomatis"""
+        delimiter = self.detect_delimiter(csv_path)
+        encoding = self.detect_encoding(csv_path)
         
-        for text, emotion in zip(texts, standardized_emotions):
-            if (len(str(text).strip()) > 3 and 
-                str(emotion).lower() not in ['nan', 'none', '', 'null']):
-                
-                processed_text = self.preprocess_text(text)
-                if len(processed_text.strip()) > 1:
-                    filtered_texts.append(processed_text)
-                    filtered_emotions.append(emotion)
+        read_kwargs = {
+            'encoding': encoding,
+            'on_bad_lines': 'skip',
+            'delimiter': delimiter,
+            'chunksize': chunksize,
+        }
+        if not has_header:
+            read_kwargs.update(header=None, names=names)
         
-        print(f"✅ Filtered dataset: {len(filtered_texts)} samples")
+        with pd.read_csv(csv_path, **read_kwargs) as reader:
+            yield from reader
+
+    def iter_emotion_csv(self, csv_path, text_column=None, emotion_column=None, has_header=True,
+                         chunksize=10000):
+        """Baca CSV per chunk (delimiter dan encoding otomatis), yield (texts, emotions) mentah"""
+        text_column = text_column or 'text'
+        emotion_column = emotion_column or 'emotion'
         
-        # Show sample data
-        print("\n📋 Sample data:")
-        for i in range(min(3, len(filtered_texts))):
-            print(f"  Text: {filtered_texts[i][:50]}...")
-            print(f"  Emotion: {filtered_emotions[i]}")
-            print()
+        chunks = self.iter_csv_chunks(
+            csv_path, has_header=has_header, names=['text', 'emotion'], chunksize=chunksize
+        )
+        for chunk in chunks:
+            if text_column not in chunk.columns or emotion_column not in chunk.columns:
+                print(f"❌ Available columns: {chunk.columns.tolist()}")
+                raise ValueError(f"Columns '{text_column}' or '{emotion_column}' not found in dataset")
+            
+            yield chunk[text_column].astype(str).tolist(), chunk[emotion_column].astype(str).tolist()
+
+    def stream_emotion_samples(self, config, chunksize=10000, workers=1, executor=None):
+        """Generator (processed_text, emotion) untuk satu dataset config, diproses per chunk"""
+        chunks = self.iter_emotion_csv(
+            config['path'],
+            config.get('text_column'),
+            config.get('emotion_column'),
+            has_header=config.get('has_header', True),
+            chunksize=chunksize
+        )
         
-        return filtered_texts, filtered_emotions
+        while True:
+            with self.timed_stage('parse'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            
+            texts, emotions = chunk
+            candidates = [
+                (text, emotion)
+                for text, emotion in zip(texts, self.standardize_emotion_labels(emotions))
+                if len(str(text).strip()) > 3 and str(emotion).lower() not in ['nan', 'none', '', 'null']
+            ]
+            
+            with self.timed_stage('preprocess'):
+                processed_texts = self.preprocess_texts(
+                    [text for text, _ in candidates], workers=workers, executor=executor
+                )
+            
+            for processed_text, (_, emotion) in zip(processed_texts, candidates):
+                if len(processed_text.strip()) > 1:
+                    yield processed_text, emotion
 
-    def load_multiple_emotion_datasets(self, dataset_configs):
+    def load_multiple_emotion_datasets(self, dataset_configs, workers=1):
         """Load dan combine multiple emotion datasets"""
         all_texts = []
         all_emotions = []
         
-        for config in dataset_configs:
+        def load_config(config, executor):
             try:
                 print(f"\n🔄 Processing: {config['path']}")
                 
                 has_header = config.get('has_header', True)
-                texts, emotions = self.load_emotion_dataset(
+                return self.load_emotion_dataset(
                     config['path'],
                     config.get('text_column'),
                     config.get('emotion_column'),
-                    has_header=has_header
+                    has_header=has_header,
+                    workers=workers,
+                    executor=executor
                 )
-                
-                # Standardize emotions
-                standardized_emotions = self.standardize_emotion_labels(emotions)
-                
-                all_texts.extend(texts)
-                all_emotions.extend(standardized_emotions)
-                
-                print(f"✅ Added {len(texts)} samples from {config['path']}")
-                
             except Exception as e:
                 print(f"❌ Error loading {config['path']}: {e}")
+                return None
+        
+        if workers > 1 and dataset_configs:
+            # Dataset dimuat bersamaan; preprocessing semua dataset berbagi satu process pool
+            with self.create_preprocess_pool(workers) as executor, \
+                    ThreadPoolExecutor(max_workers=len(dataset_configs)) as loader:
+                loaded = list(loader.map(lambda config: load_config(config, executor), dataset_configs))
+        else:
+            loaded = [load_config(config, None) for config in dataset_configs]
+        
+        # Gabungkan sesuai urutan config agar hasil deterministik
+        for config, result in zip(dataset_configs, loaded):
+            if result is None:
                 continue
+            
+            texts, emotions = result
+            
+            # Standardize emotions
+            standardized_emotions = self.standardize_emotion_labels(emotions)
+            
+            all_texts.extend(texts)
+            all_emotions.extend(standardized_emotions)
+            
+            print(f"✅ Added {len(texts)} samples from {config['path']}")
         
         if len(all_texts) == 0:
             raise ValueError("No valid data loaded from any dataset")
@@ -229,29 +543,43 @@ class EmotionDetectionModel:
 
     def preprocess_text(self, text):
         """Preprocessing untuk teks dengan fallback untuk Sastrawi"""
-        if not text or len(str(text).strip()) == 0:
-            return ""
-        
-        text = str(text).lower()
-        
-        # Remove mentions, hashtags, URLs
-        text = re.sub(r'@\w+|#\w+|http\S+|www\S+', '', text)
+        return self.preprocessor.preprocess_text(text)
+
+    def create_preprocess_pool(self, workers):
+        """Process pool untuk preprocessing; setiap worker memuat Sastrawi dan stem cache saat ini"""
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_preprocess_worker,
+            initargs=(self.preprocessor.stem_cache.items(), self.preprocessor.language_routing)
+        )
+
+    def preprocess_texts(self, texts, workers=1, executor=None):
+        """Preprocess banyak teks; dibagi per chunk ke process pool jika workers > 1, urutan tetap"""
+        if executor is None and (workers <= 1 or len(texts) < 2):
+            return self.preprocessor.preprocess_texts(texts)
         
-        # Remove special characters but keep Indonesian characters 
-        text = re.sub(r'[^a-zA-Z\s\u00C0-\u017F]', '', text)
+        if executor is None:
+            with self.create_preprocess_pool(workers) as executor:
+                return self.preprocess_texts(texts, workers=workers, executor=executor)
         
-        # Remove extra whitespace
-        text = ' '.join(text.split())
+        chunk_size = max(1, math.ceil(len(texts) / (max(workers, 1) * 4)))
+        chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
         
-        # Indonesian preprocessing if available
-        if self.stopword_remover_id and self.stemmer_id:
-            try:
-                text = self.stopword_remover_id.remove(text)
-                text = self.stemmer_id.stem(text)
-            except Exception as e:
-                print(f"⚠️  Sastrawi processing failed: {e}")
+        processed_texts = []
+        for processed_chunk, new_stems in executor.map(_preprocess_chunk, chunks):
+            processed_texts.extend(processed_chunk)
+            for word, stem in new_stems:
+                self.preprocessor.stem_cache.set(word, stem)
         
-        return text
+        return processed_texts
+
+    def load_stem_cache(self, cache_path):
+        """Muat stem cache dari disk jika ada"""
+        return self.preprocessor.load_stem_cache(cache_path)
+
+    def save_stem_cache(self, cache_path):
+        """Simpan stem cache ke disk"""
+        self.preprocessor.save_stem_cache(cache_path)
 
     def prepare_sequences(self, texts, emotions):
         """Convert text to sequences"""
@@ -272,43 +600,165 @@ class EmotionDetectionModel:
         
         return padded_sequences, encoded_emotions
 
-    def build_model(self, num_classes):
-        """Build enhanced TensorFlow model"""
+    def build_model(self, num_classes, fast=False, learning_rate=BASE_LEARNING_RATE, jit_compile=False):
+        """Build enhanced TensorFlow model.
+
+        fast=True: LSTM tanpa recurrent_dropout agar Keras memakai kernel LSTM fused
+        (recurrent_dropout memaksa loop generik per timestep); regularisasi dipindah ke
+        SpatialDropout1D setelah embedding dan Dropout di antara layer LSTM. Layer output
+        selalu float32 agar softmax stabil dengan policy mixed_bfloat16.
+        """
         print("\n🏗️  Building model...")
         
-        self.model = Sequential([
-            Embedding(self.vocab_size, 128, input_length=self.max_length),
-            Bidirectional(LSTM(64, dropout=0.3, recurrent_dropout=0.3, return_sequences=True)),
-            Bidirectional(LSTM(32, dropout=0.3, recurrent_dropout=0.3)),
-            Dense(64, activation='relu'),
-            Dropout(0.5),
-            Dense(32, activation='relu'),
-            Dropout(0.3),
-            Dense(num_classes, activation='softmax')
-        ])
+        self.predictor = None
+        if fast:
+            self.model = Sequential([
+                Embedding(self.vocab_size, 128, input_length=self.max_length),
+                SpatialDropout1D(0.2),
+                Bidirectional(LSTM(64, return_sequences=True)),
+                Dropout(0.3),
+                Bidirectional(LSTM(32)),
+                Dropout(0.3),
+                Dense(64, activation='relu'),
+                Dropout(0.5),
+                Dense(32, activation='relu'),
+                Dropout(0.3),
+                Dense(num_classes, activation='softmax', dtype='float32')
+            ])
+        else:
+            self.model = Sequential([
+                Embedding(self.vocab_size, 128, input_length=self.max_length),
+                Bidirectional(LSTM(64, dropout=0.3, recurrent_dropout=0.3, return_sequences=True)),
+                Bidirectional(LSTM(32, dropout=0.3, recurrent_dropout=0.3)),
+                Dense(64, activation='relu'),
+                Dropout(0.5),
+                Dense(32, activation='relu'),
+                Dropout(0.3),
+                Dense(num_classes, activation='softmax')
+            ])
         
         self.model.compile(
-            optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
+            optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
             loss='sparse_categorical_crossentropy',
-            metrics=['accuracy']
+            metrics=['accuracy'],
+            jit_compile=jit_compile
         )
         
         print(self.model.summary())
         return self.model
 
-    def train(self, dataset_configs, epochs=25, batch_size=64):
-        """Train model dengan multiple datasets"""
+    def training_callbacks(self, checkpoint=True):
+        """Callback training: early stopping, reduce LR, dan checkpoint model terbaik"""
+        early_stopping = tf.keras.callbacks.EarlyStopping(
+            monitor='val_loss', patience=3, restore_best_weights=True
+        )
+        
+        reduce_lr = tf.keras.callbacks.ReduceLROnPlateau(
+            monitor='val_loss', factor=0.2, patience=2, min_lr=0.0001
+        )
+        
+        model_checkpoint = tf.keras.callbacks.ModelCheckpoint(
+            'best_model.h5', monitor='val_accuracy', save_best_only=True
+        )
+        
+        if not checkpoint:
+            return [early_stopping, reduce_lr]
+        return [early_stopping, reduce_lr, model_checkpoint]
+
+    def fit_model(self, train_data, validation_data, num_classes, epochs, batch_size, fast=False,
+                  precision='float32', jit_compile=False, checkpoint=True):
+        """Build model lalu fit; train_data/validation_data berupa (X, y) atau tf.data.Dataset.
+
+        Mode cepat memakai learning rate yang diskalakan ke batch_size. precision='bfloat16'
+        melatih dengan policy mixed_bfloat16 (hanya jika CPU mendukung) lalu menyalin bobot
+        ke model float32, jadi artefak yang disimpan tetap float32.
+        Mengembalikan (history, akurasi validasi akhir).
+        """
+        use_bfloat16 = precision == 'bfloat16'
+        if use_bfloat16 and not cpu_supports_bfloat16():
+            print("⚠️  CPU has no bfloat16 support (AVX512_BF16/AMX), training in float32")
+            use_bfloat16 = False
+        
+        learning_rate = scaled_learning_rate(batch_size) if fast else BASE_LEARNING_RATE
+        print(f"\n⚙️  Training mode: {'fast' if fast else 'standard'}, batch size {batch_size}, "
+              f"learning rate {learning_rate:g}, {'bfloat16' if use_bfloat16 else 'float32'}"
+              f"{', XLA' if jit_compile else ''}")
+        
+        epoch_timer = EpochTimer()
+        callbacks = self.training_callbacks(checkpoint=checkpoint) + [epoch_timer]
+        if use_bfloat16:
+            tf.keras.mixed_precision.set_global_policy('mixed_bfloat16')
+        try:
+            self.build_model(num_classes, fast=fast, learning_rate=learning_rate, jit_compile=jit_compile)
+            
+            print("\n🎯 Training model...")
+            with self.timed_stage('fit'):
+                if isinstance(train_data, tuple):
+                    history = self.model.fit(
+                        train_data[0], train_data[1],
+                        epochs=epochs,
+                        batch_size=batch_size,
+                        validation_data=validation_data,
+                        callbacks=callbacks,
+                        verbose=1
+                    )
+                else:
+                    history = self.model.fit(
+                        train_data,
+                        epochs=epochs,
+                        validation_data=validation_data,
+                        callbacks=callbacks,
+                        verbose=1
+                    )
+            
+            if use_bfloat16:
+                self.model = float32_copy(self.model)
+        finally:
+            if use_bfloat16:
+                tf.keras.mixed_precision.set_global_policy('float32')
+        
+        self.epoch_timings = epoch_timer.timings
+        
+        # Final evaluation
+        if isinstance(validation_data, tuple):
+            test_loss, test_accuracy = self.model.evaluate(*validation_data, verbose=0)
+        else:
+            test_loss, test_accuracy = self.model.evaluate(validation_data, verbose=0)
+        print(f"\n✅ Final Test Accuracy: {test_accuracy:.4f}")
+        if self.epoch_timings:
+            print(f"⏱️  {len(self.epoch_timings)} epochs, "
+                  f"{sum(self.epoch_timings) / len(self.epoch_timings):.1f}s per epoch")
+        
+        return history, test_accuracy
+
+    def train(self, dataset_configs, epochs=25, batch_size=None, workers=1, streaming=False, fast=False,
+              precision='float32', jit_compile=False):
+        """Train model dengan multiple datasets.
+
+        fast=True memilih mode training cepat (lihat build_model dan fit_model); batch_size
+        default BASE_BATCH_SIZE, atau FAST_BATCH_SIZE di mode cepat.
+        """
+        batch_size = batch_size or (FAST_BATCH_SIZE if fast else BASE_BATCH_SIZE)
+        if streaming:
+            return self.train_streaming(
+                dataset_configs, epochs=epochs, batch_size=batch_size, workers=workers, fast=fast,
+                precision=precision, jit_compile=jit_compile
+            )
+        
         print("🚀 Starting training process...")
         print(f"📝 Dataset configs: {len(dataset_configs)} datasets")
         
+        self.stage_timings = {}
+        
         # Load multiple datasets
-        texts, emotions = self.load_multiple_emotion_datasets(dataset_configs)
+        texts, emotions = self.load_multiple_emotion_datasets(dataset_configs, workers=workers)
         
         if len(texts) == 0:
             raise ValueError("No data loaded. Please check your dataset paths.")
         
         # Prepare sequences
-        X, y = self.prepare_sequences(texts, emotions)
+        with self.timed_stage('tokenize'):
+            X, y = self.prepare_sequences(texts, emotions)
         
         # Split data
         print("\n📊 Splitting data...")
@@ -319,38 +769,409 @@ class EmotionDetectionModel:
         print(f"📊 Training samples: {len(X_train)}")
         print(f"📊 Test samples: {len(X_test)}")
         
-        # Build model
+        # Build model dan train
         num_classes = len(np.unique(y))
-        self.build_model(num_classes)
+        history, _ = self.fit_model(
+            (X_train, y_train), (X_test, y_test), num_classes, epochs, batch_size, fast=fast,
+            precision=precision, jit_compile=jit_compile
+        )
         
-        # Callbacks
-        early_stopping = tf.keras.callbacks.EarlyStopping(
-            monitor='val_loss', patience=3, restore_best_weights=True
+        self.build_predictor()
+        self.print_stage_timings()
+        
+        return history
+
+    def compare_training_modes(self, dataset_configs, epochs=25, workers=1, precision='float32',
+                               jit_compile=False):
+        """Latih konfigurasi standar dan mode cepat pada split yang sama (tanpa menyimpan model).
+
+        Mengembalikan jumlah epoch, detik per epoch, total detik fit dan akurasi validasi akhir
+        per mode; model mode cepat tetap dipakai sebagai self.model setelahnya.
+        """
+        texts, emotions = self.load_multiple_emotion_datasets(dataset_configs, workers=workers)
+        if len(texts) == 0:
+            raise ValueError("No data loaded. Please check your dataset paths.")
+        
+        X, y = self.prepare_sequences(texts, emotions)
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42, stratify=y
         )
+        num_classes = len(np.unique(y))
         
-        reduce_lr = tf.keras.callbacks.ReduceLROnPlateau(
-            monitor='val_loss', factor=0.2, patience=2, min_lr=0.0001
+        results = {}
+        for mode, fast, batch_size in (('standard', False, BASE_BATCH_SIZE), ('fast', True, FAST_BATCH_SIZE)):
+            tf.keras.utils.set_random_seed(42)
+            start = time.perf_counter()
+            _, accuracy = self.fit_model(
+                (X_train, y_train), (X_test, y_test), num_classes, epochs, batch_size, fast=fast,
+                precision=precision if fast else 'float32', jit_compile=jit_compile and fast, checkpoint=False
+            )
+            results[mode] = {
+                'epochs': len(self.epoch_timings),
+                'seconds_per_epoch': sum(self.epoch_timings) / len(self.epoch_timings),
+                'fit_seconds': time.perf_counter() - start,
+                'accuracy': float(accuracy),
+            }
+        
+        print(f"\n📊 {'mode':10s} {'epochs':>7s} {'s/epoch':>9s} {'fit s':>9s} {'accuracy':>9s}")
+        for mode, stats in results.items():
+            print(f"   {mode:10s} {stats['epochs']:7d} {stats['seconds_per_epoch']:9.1f} "
+                  f"{stats['fit_seconds']:9.1f} {stats['accuracy']:9.4f}")
+        speedup = results['standard']['seconds_per_epoch'] / results['fast']['seconds_per_epoch']
+        print(f"⚡ Fast mode: {speedup:.1f}x faster per epoch, "
+              f"accuracy {results['fast']['accuracy'] - results['standard']['accuracy']:+.4f}")
+        
+        self.build_predictor()
+        return results
+
+    def train_streaming(self, dataset_configs, epochs=25, batch_size=BASE_BATCH_SIZE, workers=1, test_size=0.2,
+                        chunksize=10000, shuffle_buffer=10000, spool_dir=None, spool_shard_size=SPOOL_SHARD_SIZE,
+                        fast=False, precision='float32', jit_compile=False):
+        """Train dari dataset yang dibaca per chunk dan diumpankan lewat tf.data.
+
+        Pass pertama membaca dataset per chunk, melakukan preprocessing, fit tokenizer secara
+        bertahap dan menulis hasilnya ke file spool train (shard berisi spool_shard_size baris)
+        dan validation di disk. Split validasi
+        tetap stratified: sampel ke-k dari setiap kelas masuk validasi jika
+        floor((k + 1) * test_size) > floor(k * test_size). Tokenisasi dan padding dilakukan
+        di dalam pipeline tf.data (lookup table, parallel map, shuffle buffer, prefetch),
+        sehingga memori puncak tidak bergantung pada ukuran korpus. Shard train dibaca dalam
+        urutan acak per epoch agar dataset yang lebih besar dari shuffle buffer tetap tercampur.
+        """
+        print("🚀 Starting streaming training process...")
+        print(f"📝 Dataset configs: {len(dataset_configs)} datasets")
+        
+        self.stage_timings = {}
+        own_spool_dir = spool_dir is None
+        spool_dir = spool_dir or tempfile.mkdtemp(prefix='emotion_spool_')
+        os.makedirs(spool_dir, exist_ok=True)
+        val_path = os.path.join(spool_dir, 'validation.tsv')
+        
+        try:
+            self.tokenizer = Tokenizer(num_words=self.vocab_size, oov_token='<OOV>')
+            label_counts = {}
+            counts = {'train': 0, 'validation': 0}
+            
+            executor = self.create_preprocess_pool(workers) if workers > 1 else None
+            try:
+                with ShardedSpoolWriter(spool_dir, 'train', spool_shard_size) as train_spool, \
+                        open(val_path, 'w', encoding='utf-8') as val_file:
+                    for config in dataset_configs:
+                        print(f"\n🔄 Streaming: {config['path']}")
+                        try:
+                            samples = self.stream_emotion_samples(
+                                config, chunksize=chunksize, workers=workers, executor=executor
+                            )
+                            added = self._spool_samples(
+                                samples, train_spool, val_file, label_counts, counts, test_size, chunksize
+                            )
+                            print(f"✅ Added {added} samples from {config['path']}")
+                        except Exception as e:
+                            print(f"❌ Error loading {config['path']}: {e}")
+                            continue
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+            
+            if counts['train'] == 0 or counts['validation'] == 0:
+                raise ValueError("No data loaded. Please check your dataset paths.")
+            
+            self.label_encoder = LabelEncoder()
+            self.label_encoder.fit(list(label_counts))
+            
+            print(f"\n🎯 Total streamed dataset: {counts['train'] + counts['validation']} samples")
+            print(f"📊 Vocabulary size: {len(self.tokenizer.word_index)}")
+            print(f"📊 Emotion classes: {self.label_encoder.classes_}")
+            print(f"📊 Training samples: {counts['train']}")
+            print(f"📊 Test samples: {counts['validation']}")
+            
+            print(f"📊 Training spool shards: {len(train_spool.paths)}")
+            
+            train_dataset = self.build_streaming_dataset(
+                train_spool.paths, batch_size, shuffle_buffer=shuffle_buffer
+            )
+            val_dataset = self.build_streaming_dataset(val_path, batch_size)
+            
+            history, _ = self.fit_model(
+                train_dataset, val_dataset, len(self.label_encoder.classes_), epochs, batch_size, fast=fast,
+                precision=precision, jit_compile=jit_compile
+            )
+        finally:
+            if own_spool_dir:
+                shutil.rmtree(spool_dir, ignore_errors=True)
+        
+        self.build_predictor()
+        self.print_stage_timings()
+        
+        return history
+
+    def _spool_samples(self, samples, train_spool, val_file, label_counts, counts, test_size, chunksize):
+        """Tulis sampel ke spool train/validation dan fit tokenizer per chunk"""
+        added = 0
+        pending_texts = []
+        
+        for processed_text, emotion in samples:
+            label = str(emotion).replace('\t', ' ')
+            k = label_counts.get(emotion, 0)
+            label_counts[emotion] = k + 1
+            
+            # Split stratified deterministik per kelas
+            is_validation = math.floor((k + 1) * test_size) > math.floor(k * test_size)
+            target = val_file if is_validation else train_spool
+            target.write(f'{label}\t{processed_text}\n')
+            counts['validation' if is_validation else 'train'] += 1
+            
+            pending_texts.append(processed_text)
+            added += 1
+            if len(pending_texts) >= chunksize:
+                with self.timed_stage('tokenize'):
+                    self.tokenizer.fit_on_texts(pending_texts)
+                pending_texts = []
+        
+        if pending_texts:
+            with self.timed_stage('tokenize'):
+                self.tokenizer.fit_on_texts(pending_texts)
+        
+        return added
+
+    def build_streaming_dataset(self, spool_paths, batch_size, shuffle_buffer=None):
+        """tf.data pipeline dari file spool: tokenisasi dan padding seperti texts_to_sequences + pad_sequences.
+
+        Dengan shuffle_buffer, urutan file shard diacak setiap epoch dan SPOOL_INTERLEAVE shard
+        dibaca bergantian sebelum shuffle buffer; tanpa itu dataset pertama yang di-spool
+        mendominasi batch awal setiap epoch jika lebih besar dari buffer.
+        """
+        if isinstance(spool_paths, str):
+            spool_paths = [spool_paths]
+        oov_index = self.tokenizer.word_index[self.tokenizer.oov_token]
+        vocabulary = [
+            (word, index) for word, index in self.tokenizer.word_index.items()
+            if index < self.vocab_size
+        ]
+        word_table = tf.lookup.StaticHashTable(
+            tf.lookup.KeyValueTensorInitializer(
+                tf.constant([word for word, _ in vocabulary]),
+                tf.constant([index for _, index in vocabulary], dtype=tf.int32)
+            ),
+            default_value=oov_index
         )
+        label_table = tf.lookup.StaticHashTable(
+            tf.lookup.KeyValueTensorInitializer(
+                tf.constant([str(label).replace('\t', ' ') for label in self.label_encoder.classes_]),
+                tf.range(len(self.label_encoder.classes_), dtype=tf.int32)
+            ),
+            default_value=-1
+        )
+        max_length = self.max_length
         
-        model_checkpoint = tf.keras.callbacks.ModelCheckpoint(
-            'best_model.h5', monitor='val_accuracy', save_best_only=True
+        def encode(line):
+            parts = tf.strings.split(line, sep='\t', maxsplit=1)
+            label = label_table.lookup(parts[0])
+            token_ids = word_table.lookup(tf.strings.split(parts[1]))
+            # pad_sequences: truncating='pre', padding='post'
+            token_ids = token_ids[-max_length:]
+            token_ids = tf.pad(token_ids, [[0, max_length - tf.shape(token_ids)[0]]])
+            return tf.ensure_shape(token_ids, [max_length]), label
+        
+        if shuffle_buffer:
+            dataset = (
+                tf.data.Dataset.from_tensor_slices(spool_paths)
+                .shuffle(len(spool_paths), reshuffle_each_iteration=True)
+                .interleave(
+                    tf.data.TextLineDataset,
+                    cycle_length=min(SPOOL_INTERLEAVE, len(spool_paths)),
+                    num_parallel_calls=tf.data.AUTOTUNE
+                )
+                .shuffle(shuffle_buffer, reshuffle_each_iteration=True)
+            )
+        else:
+            dataset = tf.data.TextLineDataset(spool_paths)
+        
+        return (
+            dataset
+            .map(encode, num_parallel_calls=tf.data.AUTOTUNE)
+            .batch(batch_size)
+            .prefetch(tf.data.AUTOTUNE)
         )
+
+    def extend_vocabulary(self, processed_texts, max_new_words):
+        """Tambahkan kata baru yang paling sering ke slot setelah vocabulary lama.
+
+        Index kata yang sudah dipakai model (< vocab_size) tidak berubah. Kata baru mendapat
+        index setelah kata aktif terakhir; kata lama di luar vocab_size (selama ini OOV)
+        bergeser ke belakangnya. Jika slot kosong tidak cukup, matriks embedding diperbesar
+        dengan baris baru berisi rata-rata embedding lama. Mengembalikan kata yang ditambahkan.
+        """
+        word_index = self.tokenizer.word_index
+        counts = {}
+        for text in processed_texts:
+            for word in text.split():
+                if word_index.get(word, self.vocab_size) >= self.vocab_size:
+                    counts[word] = counts.get(word, 0) + 1
         
-        # Train
-        print("\n🎯 Training model...")
-        history = self.model.fit(
-            X_train, y_train,
-            epochs=epochs,
-            batch_size=batch_size,
-            validation_data=(X_test, y_test),
-            callbacks=[early_stopping, reduce_lr, model_checkpoint],
-            verbose=1
+        new_words = sorted(counts, key=counts.get, reverse=True)[:max_new_words]
+        if not new_words:
+            return []
+        
+        # Urutan index baru: vocabulary aktif, kata baru, lalu sisa kata di luar vocabulary
+        ordered = sorted(word_index, key=word_index.get)
+        added = set(new_words)
+        ordered = (
+            ordered[:self.vocab_size - 1] + new_words
+            + [word for word in ordered[self.vocab_size - 1:] if word not in added]
         )
+        self.tokenizer.word_index = {word: index for index, word in enumerate(ordered, start=1)}
+        self.tokenizer.index_word = {index: word for word, index in self.tokenizer.word_index.items()}
+        for word in new_words:
+            self.tokenizer.word_counts[word] = self.tokenizer.word_counts.get(word, 0) + counts[word]
         
-        # Final evaluation
-        test_loss, test_accuracy = self.model.evaluate(X_test, y_test, verbose=0)
-        print(f"\n✅ Final Test Accuracy: {test_accuracy:.4f}")
+        # Vocabulary lama bisa lebih kecil dari vocab_size: slot kosong dipakai dulu
+        old_vocab_size = self.vocab_size
+        required_size = min(len(word_index), old_vocab_size - 1) + len(new_words) + 1
+        if required_size <= old_vocab_size:
+            print(f"📊 Vocabulary extended with {len(new_words)} new words (free slots, embedding unchanged)")
+            return new_words
+        
+        self.vocab_size = required_size
+        self.tokenizer.num_words = self.vocab_size
+        
+        def resized_layer(layer):
+            config = layer.get_config()
+            if isinstance(layer, Embedding):
+                config['input_dim'] = self.vocab_size
+            return layer.__class__.from_config(config)
+        
+        resized_model = tf.keras.models.clone_model(self.model, clone_function=resized_layer)
+        weights = self.model.get_weights()
+        embeddings = weights[0]
+        new_rows = np.repeat(embeddings.mean(axis=0, keepdims=True), self.vocab_size - old_vocab_size, axis=0)
+        weights[0] = np.concatenate([embeddings, new_rows], axis=0)
+        resized_model.set_weights(weights)
+        self.model = resized_model
+        
+        print(f"📊 Vocabulary extended with {len(new_words)} new words, embedding {old_vocab_size} -> {self.vocab_size} rows")
+        return new_words
+
+    def encode_samples(self, processed_texts, emotions):
+        """Sequence dan label dengan tokenizer/label encoder yang sudah ada (tanpa fit ulang)"""
+        sequences = self.tokenizer.texts_to_sequences(processed_texts)
+        padded_sequences = pad_sequences(sequences, maxlen=self.max_length, padding='post')
+        return padded_sequences, self.label_encoder.transform(emotions)
+
+    def fine_tune(self, new_dataset_configs, replay_dataset_configs=(), replay_ratio=1.0, new_words=0,
+                  epochs=5, batch_size=BASE_BATCH_SIZE, learning_rate=FINE_TUNE_LEARNING_RATE, workers=1,
+                  seed=42):
+        """Fine-tune model yang sudah dimuat (load_model) dengan sampel baru saja.
+
+        Tokenizer dan label encoder tidak di-fit ulang, jadi index vocabulary tetap; dengan
+        new_words > 0 kata baru ditambahkan lewat extend_vocabulary. Data training berisi
+        sampel baru plus sampel replay acak dari dataset lama (replay_ratio x jumlah sampel
+        baru) agar model tidak melupakan data lama. 20% sampel baru dan replay ditahan untuk
+        validasi; akurasi sebelum dan sesudah dilaporkan per bagian.
+        """
+        if self.model is None or self.tokenizer is None or self.label_encoder is None:
+            raise ValueError("No model loaded. Call load_model() before fine_tune().")
+        
+        print("🚀 Starting incremental fine-tuning...")
+        self.stage_timings = {}
+        started = time.perf_counter()
+        rng = np.random.default_rng(seed)
+        
+        new_texts, new_emotions = self.load_multiple_emotion_datasets(new_dataset_configs, workers=workers)
+        if len(new_texts) == 0:
+            raise ValueError("No new samples loaded. Please check your dataset paths.")
+        
+        known_labels = set(self.label_encoder.classes_.tolist())
+        unknown_labels = sorted({str(emotion) for emotion in new_emotions if emotion not in known_labels})
+        if unknown_labels:
+            raise ValueError(f"Labels not known to the model: {unknown_labels}. "
+                             "Fine-tuning cannot add classes; retrain with train() instead.")
+        
+        replay_texts, replay_emotions = [], []
+        if replay_dataset_configs and replay_ratio > 0:
+            old_texts, old_emotions = self.load_multiple_emotion_datasets(replay_dataset_configs, workers=workers)
+            keep = [i for i, emotion in enumerate(old_emotions) if emotion in known_labels]
+            replay_size = min(len(keep), int(round(replay_ratio * len(new_texts))))
+            for i in rng.choice(keep, size=replay_size, replace=False):
+                replay_texts.append(old_texts[i])
+                replay_emotions.append(old_emotions[i])
+        print(f"📊 New samples: {len(new_texts)}, replay samples: {len(replay_texts)}")
+        
+        def split(size):
+            """Index train dan validasi (20%); set kecil tidak punya validasi"""
+            if size < 5:
+                return np.arange(size), np.arange(0)
+            indices = rng.permutation(size)
+            cut = size - max(1, int(size * 0.2))
+            return indices[:cut], indices[cut:]
+        
+        new_train, new_val = split(len(new_texts))
+        replay_train, replay_val = split(len(replay_texts))
+        
+        def encode():
+            with self.timed_stage('tokenize'):
+                X_new, y_new = self.encode_samples(new_texts, new_emotions)
+                X_replay, y_replay = self.encode_samples(replay_texts, replay_emotions)
+            return X_new, y_new, X_replay, y_replay
+        
+        def evaluate():
+            accuracies = {}
+            for name, X, y in (('new', X_new[new_val], y_new[new_val]),
+                               ('replay', X_replay[replay_val], y_replay[replay_val])):
+                if len(y):
+                    accuracies[name] = float(self.model.evaluate(X, y, batch_size=256, verbose=0)[1])
+            return accuracies
+        
+        def compile_model():
+            self.model.compile(
+                optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+                loss='sparse_categorical_crossentropy',
+                metrics=['accuracy']
+            )
+        
+        # Akurasi "before" diukur dengan tokenizer dan model yang dimuat (kata baru masih OOV)
+        X_new, y_new, X_replay, y_replay = encode()
+        compile_model()
+        before = evaluate()
         
+        if new_words and self.extend_vocabulary(new_texts, new_words):
+            # Model bisa diganti (embedding diperbesar) dan kata baru sekarang punya index sendiri
+            compile_model()
+            X_new, y_new, X_replay, y_replay = encode()
+        
+        X_train = np.concatenate([X_new[new_train], X_replay[replay_train]])
+        y_train = np.concatenate([y_new[new_train], y_replay[replay_train]])
+        X_val = np.concatenate([X_new[new_val], X_replay[replay_val]])
+        y_val = np.concatenate([y_new[new_val], y_replay[replay_val]])
+        
+        epoch_timer = EpochTimer()
+        callbacks = [epoch_timer]
+        validation_data = None
+        if len(y_val):
+            validation_data = (X_val, y_val)
+            callbacks = self.training_callbacks(checkpoint=False) + callbacks
+        
+        print("\n🎯 Fine-tuning model...")
+        with self.timed_stage('fit'):
+            history = self.model.fit(
+                X_train, y_train,
+                epochs=epochs,
+                batch_size=batch_size,
+                shuffle=True,
+                validation_data=validation_data,
+                callbacks=callbacks,
+                verbose=1
+            )
+        self.epoch_timings = epoch_timer.timings
+        
+        after = evaluate()
+        print("\n📊 Validation accuracy before -> after fine-tuning:")
+        for name in after:
+            print(f"  {name}: {before[name]:.4f} -> {after[name]:.4f}")
+        print(f"⏱️  Fine-tuning took {time.perf_counter() - started:.1f}s")
+        
+        self.build_predictor()
+        self.print_stage_timings()
         return history
 
     def save_model(self, model_path='model/emotion_model'):
@@ -368,42 +1189,116 @@ class EmotionDetectionModel:
         config = {
             'max_length': self.max_length,
             'vocab_size': self.vocab_size,
-            'classes': self.label_encoder.classes_.tolist()
+            'classes': self.label_encoder.classes_.tolist(),
+            'language_routing': self.preprocessor.language_routing
         }
         
         with open(f'{model_path}_config.pkl', 'wb') as f:
             pickle.dump(config, f)
         
+        self.export_serving_artifacts(model_path)
+        self.save_stem_cache(f'{model_path}_stem_cache.json')
+        
         print(f"💾 Emotion model saved to {model_path}")
 
-    def predict_emotion(self, text):
-        """Predict emotion for a single text"""
-        if not self.model or not self.tokenizer or not self.label_encoder:
-            raise ValueError("Model not trained or loaded. Please train or load a model first.")
+    def export_serving_artifacts(self, model_path):
+        """Tulis artefak serving tanpa pickle: vocabulary dipangkas ke vocab_size dan config JSON"""
+        vocabulary = [
+            word for word, index in sorted(self.tokenizer.word_index.items(), key=lambda item: item[1])
+            if index < self.vocab_size
+        ]
+        write_serving_artifacts(
+            model_path,
+            vocabulary,
+            self.label_encoder.classes_.tolist(),
+            self.max_length,
+            self.vocab_size,
+            oov_index=self.tokenizer.word_index[self.tokenizer.oov_token],
+            preprocessing=self.preprocessing_settings()
+        )
+        export_numpy_weights(self.model, serving_artifact_paths(model_path)['weights'])
+        print(f"💾 Serving artifacts exported to {model_path}_vocab.txt / {model_path}_serving.json "
+              f"/ {model_path}_weights.npz")
+
+    def export_tflite(self, model_path, quantization='dynamic'):
+        """Export varian post-training-quantized: TFLite dengan bobot int8 ('dynamic') atau float16.
+
+        Konversi memakai salinan model tanpa dropout/recurrent_dropout (tidak aktif saat
+        inferensi, jadi output identik) agar LSTM dikonversi ke op fused TFLite. Input
+        ditetapkan [1, max_length] karena LSTM fused tidak bisa di-resize ke batch lain.
+        """
+        def inference_layer(layer):
+            config = layer.get_config()
+            if isinstance(layer, Bidirectional):
+                config['layer']['config'].update(dropout=0.0, recurrent_dropout=0.0)
+            return layer.__class__.from_config(config)
         
-        # Preprocess text
-        processed_text = self.preprocess_text(text)
+        inference_model = tf.keras.models.clone_model(self.model, clone_function=inference_layer)
+        inference_model.set_weights(self.model.get_weights())
         
-        # Convert to sequence
-        sequence = self.tokenizer.texts_to_sequences([processed_text])
-        padded_sequence = pad_sequences(sequence, maxlen=self.max_length, padding='post')
+        @tf.function(input_signature=[tf.TensorSpec([1, self.max_length], tf.int32)])
+        def serving_fn(sequences):
+            return inference_model(sequences, training=False)
         
-        # Predict
-        prediction = self.model.predict(padded_sequence, verbose=0)
-        predicted_class = np.argmax(prediction[0])
-        confidence = prediction[0][predicted_class]
+        converter = tf.lite.TFLiteConverter.from_concrete_functions(
+            [serving_fn.get_concrete_function()], inference_model
+        )
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if quantization == 'float16':
+            converter.target_spec.supported_types = [tf.float16]
+        elif quantization != 'dynamic':
+            raise ValueError(f"Unknown quantization: {quantization}")
         
-        # Get emotion label
-        emotion_label = self.label_encoder.inverse_transform([predicted_class])[0]
+        tflite_path = tflite_model_path(model_path, quantization)
+        with open(tflite_path, 'wb') as f:
+            f.write(converter.convert())
         
-        return {
-            'emotion': emotion_label,
-            'confidence': float(confidence),
-            'all_probabilities': {
-                self.label_encoder.inverse_transform([i])[0]: float(prediction[0][i]) 
-                for i in range(len(prediction[0]))
-            }
+        print(f"💾 TFLite ({quantization}) exported to {tflite_path} "
+              f"({os.path.getsize(tflite_path) / 1e6:.1f} MB)")
+        return tflite_path
+
+    def build_predictor(self, model_version='unsaved'):
+        """Bangun EmotionPredictor dari model, tokenizer dan label encoder di memori"""
+        word_index = {
+            word: index for word, index in self.tokenizer.word_index.items()
+            if index < self.vocab_size
         }
+        self.predictor = EmotionPredictor(
+            self.model,
+            word_index,
+            self.label_encoder.classes_.tolist(),
+            self.max_length,
+            self.vocab_size,
+            oov_index=self.tokenizer.word_index[self.tokenizer.oov_token],
+            preprocessor=self.preprocessor,
+            use_length_buckets=self.use_length_buckets,
+            length_buckets=self.length_buckets,
+            model_version=model_version
+        )
+        self.predictor.build_serving_function()
+        return self.predictor
+
+    def predict_emotion(self, text):
+        """Predict emotion for a single text"""
+        return self.predict_emotions([text])[0]
+
+    def predict_emotions(self, texts, batch_size=256):
+        """Predict emotion untuk banyak teks sekaligus dalam satu forward pass per chunk"""
+        processed_texts = self.preprocessor.preprocess_texts(texts)
+        return self.predict_preprocessed(processed_texts, batch_size=batch_size)
+
+    def predict_preprocessed(self, processed_texts, batch_size=256):
+        """Predict emotion untuk teks yang sudah melalui preprocess_text"""
+        if not self.predictor:
+            raise ValueError("Model not trained or loaded. Please train or load a model first.")
+        
+        return self.predictor.predict_preprocessed(processed_texts, batch_size=batch_size)
+
+    def save_versioned_model(self, model_path='model/emotion_detection_model'):
+        """Simpan ke {model_path}-{timestamp} tanpa menimpa artefak yang sedang di-serve"""
+        versioned_path = f"{model_path}-{time.strftime('%Y%m%d-%H%M%S')}"
+        self.save_model(versioned_path)
+        return versioned_path
 
     def load_model(self, model_path='model/emotion_detection_model'):
         """Load trained model and associated components"""
@@ -424,18 +1319,82 @@ class EmotionDetectionModel:
                 config = pickle.load(f)
                 self.max_length = config['max_length']
                 self.vocab_size = config['vocab_size']
+                # Model lama (sebelum language routing) memakai Sastrawi untuk semua teks
+                self.preprocessor.language_routing = config.get('language_routing', False)
+            
+            # Stem cache bersifat opsional
+            self.load_stem_cache(f'{model_path}_stem_cache.json')
+            
+            # Compile serving function sekali dan warm-up; cache hasil lama ikut dibuang
+            self.build_predictor(model_version=saved_model_version(f'{model_path}_tf'))
+            if self.backend == 'tflite':
+                self.predictor.quantization = self.tflite_quantization
+                self.predictor.load_tflite(tflite_model_path(model_path, self.tflite_quantization))
+            elif self.backend == 'numpy':
+                self.predictor.load_numpy(serving_artifact_paths(model_path)['weights'])
+            self.predictor.warmup()
             
             print("✅ Model loaded successfully!")
         except Exception as e:
             print(f"❌ Error loading model: {e}")
             self.model = None
+            self.predictor = None
             self.tokenizer = None
             self.label_encoder = None
             raise ValueError("Failed to load model. Please check the model files.")
 
 # Training script
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Train the emotion detection model')
+    parser.add_argument('--epochs', type=int, default=None, help='Default 25, or 5 with --fine-tune')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help=f'Default {BASE_BATCH_SIZE}, or {FAST_BATCH_SIZE} with --fast')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes used for dataset preprocessing')
+    parser.add_argument('--no-corpus-cache', action='store_true',
+                        help='Always re-read and re-preprocess the datasets')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Stream datasets from disk through tf.data instead of loading them into memory')
+    parser.add_argument('--export-serving', action='store_true',
+                        help='Only export pickle-free serving artifacts (and --export-tflite variants) for the saved model')
+    parser.add_argument('--export-tflite', nargs='+', choices=['dynamic', 'float16'], default=[],
+                        help='Also export post-training-quantized TFLite variants')
+    parser.add_argument('--fast', action='store_true',
+                        help='Fast training mode: fused-kernel LSTM, larger batches with a scaled learning rate')
+    parser.add_argument('--precision', choices=['float32', 'bfloat16'], default='float32',
+                        help='bfloat16 mixed precision for --fast (only on CPUs with AVX512_BF16/AMX)')
+    parser.add_argument('--jit-compile', action='store_true',
+                        help='Compile the train step with XLA (usually slower for LSTMs on CPU)')
+    parser.add_argument('--compare-modes', action='store_true',
+                        help='Train the standard and the fast configuration and compare them; nothing is saved')
+    parser.add_argument('--fine-tune', nargs='+', default=None, metavar='CSV',
+                        help='Fine-tune the saved model on these datasets (text,label with header) '
+                             'and save a new versioned artifact set')
+    parser.add_argument('--replay-ratio', type=float, default=1.0,
+                        help='Old samples replayed per new sample during --fine-tune')
+    parser.add_argument('--new-words', type=int, default=0,
+                        help='Maximum number of new words appended to the vocabulary during --fine-tune')
+    parser.add_argument('--learning-rate', type=float, default=FINE_TUNE_LEARNING_RATE,
+                        help='Learning rate for --fine-tune')
+    parser.add_argument('--no-language-routing', action='store_true',
+                        help='Run Sastrawi on every text, including texts detected as English')
+    args = parser.parse_args()
+    
     emotion_model = EmotionDetectionModel()
+    # Model baru: teks Inggris tidak di-stem Sastrawi (--fine-tune/--export-serving memakai setting model)
+    emotion_model.preprocessor.language_routing = not args.no_language_routing
+    
+    if args.export_serving:
+        emotion_model.load_model('model/emotion_detection_model')
+        emotion_model.export_serving_artifacts('model/emotion_detection_model')
+        for quantization in args.export_tflite:
+            emotion_model.export_tflite('model/emotion_detection_model', quantization)
+        raise SystemExit(0)
+    if args.no_corpus_cache:
+        emotion_model.corpus_cache_dir = None
+    
+    # Pakai ulang stem dari training run sebelumnya
+    emotion_model.load_stem_cache('model/emotion_detection_model_stem_cache.json')
     
     # Dataset configuration - Updated untuk format yang benar
     dataset_configs = [
@@ -453,12 +1412,52 @@ if __name__ == "__main__":
         }
     ]
     
+    if args.compare_modes:
+        emotion_model.compare_training_modes(
+            dataset_configs, epochs=args.epochs or 25, workers=args.workers, precision=args.precision,
+            jit_compile=args.jit_compile
+        )
+        raise SystemExit(0)
+    
+    if args.fine_tune:
+        emotion_model.load_model('model/emotion_detection_model')
+        emotion_model.fine_tune(
+            [
+                {'path': path, 'has_header': True, 'text_column': 'text', 'emotion_column': 'label'}
+                for path in args.fine_tune
+            ],
+            replay_dataset_configs=dataset_configs,
+            replay_ratio=args.replay_ratio,
+            new_words=args.new_words,
+            epochs=args.epochs or 5,
+            batch_size=args.batch_size or BASE_BATCH_SIZE,
+            learning_rate=args.learning_rate,
+            workers=args.workers
+        )
+        versioned_path = emotion_model.save_versioned_model('model/emotion_detection_model')
+        for quantization in args.export_tflite:
+            emotion_model.export_tflite(versioned_path, quantization)
+        print(f"🎉 Fine-tuned model saved to {versioned_path}. "
+              f"Activate it with POST /models/load {{\"model_path\": \"{versioned_path}\"}}")
+        raise SystemExit(0)
+    
     try:
         # Train
-        history = emotion_model.train(dataset_configs, epochs=25, batch_size=64)
+        history = emotion_model.train(
+            dataset_configs,
+            epochs=args.epochs or 25,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            streaming=args.streaming,
+            fast=args.fast,
+            precision=args.precision,
+            jit_compile=args.jit_compile
+        )
         
         # Save
         emotion_model.save_model('model/emotion_detection_model')
+        for quantization in args.export_tflite:
+            emotion_model.export_tflite('model/emotion_detection_model', quantization)
         
         print("🎉 Training completed successfully!")
         